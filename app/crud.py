@@ -77,6 +77,34 @@ class AlertCRUD:
             db.rollback()
             raise
     
+    @staticmethod
+    def create_alerts(db: Session, alerts: List[dict]) -> List[Alert]:
+        """
+        Create several flood prediction alerts in a single transaction.
+        
+        Args:
+            db: Database session
+            alerts: Alert field dictionaries, as accepted by create_alert
+            
+        Returns:
+            List[Alert]: The created alert objects
+            
+        Raises:
+            Exception: If database operation fails
+        """
+        try:
+            created = [Alert(**fields) for fields in alerts]
+            db.add_all(created)
+            db.commit()
+            
+            logger.info(f"Created {len(created)} alerts in one transaction")
+            return created
+            
+        except Exception as e:
+            logger.error(f"Failed to create alerts: {e}")
+            db.rollback()
+            raise
+    
     @staticmethod
     def get_alert_by_id(db: Session, alert_id: int) -> Optional[Alert]:
         """
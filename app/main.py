@@ -14,6 +14,7 @@ from contextlib import asynccontextmanager
 from app.database import init_db
 from app.routers import predict, alerts, sos, flood_monitoring, disaster, iot_enhanced
 from app.ml_model import initialize_model
+from app.metrics import metrics_app
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +39,7 @@ async def lifespan(app: FastAPI):
     logger.info("Starting JalRakshā AI application...")
     await init_db()
     logger.info("Database initialized successfully")
+    await sos.init_sos_connections()
     
     # Initialize ML model
     logger.info("Initializing ML model...")
@@ -52,6 +54,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down JalRakshā AI application...")
+    await sos.close_sos_connections()
 
 
 # Create FastAPI application instance
@@ -79,6 +82,9 @@ app.include_router(flood_monitoring.router, prefix="/api/v1", tags=["flood-monit
 app.include_router(disaster.router, prefix="/api", tags=["disaster"])
 app.include_router(iot_enhanced.router, prefix="/api/v1", tags=["iot"])
 
+# Expose Prometheus metrics
+app.mount("/metrics", metrics_app)
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,33 @@
+"""
+Prometheus Metrics for JalRakshā AI
+
+This module defines the process-wide Prometheus collectors used to
+instrument the IoT and prediction hot paths. Collectors are created once
+at import time and shared by the routers; the ASGI app exposing them is
+mounted at /metrics by the main application.
+"""
+
+from prometheus_client import Histogram, make_asgi_app
+
+# SQLite write latency for IoT sensor data and health updates
+SQL_WRITE_LAT = Histogram(
+    "iot_sql_write_seconds",
+    "Time spent writing IoT rows to SQLite",
+    buckets=(.0005, .001, .005, .01, .05, .1, .5, 1)
+)
+
+# Number of rows written per SQLite transaction
+BATCH_SIZE = Histogram(
+    "iot_write_batch_rows",
+    "Rows written per IoT SQLite transaction",
+    buckets=(1, 10, 50, 100, 500, 1000)
+)
+
+# ML model inference latency
+ML_INFER = Histogram(
+    "predict_inference_seconds",
+    "Time spent in flood risk model inference"
+)
+
+# ASGI application serving the default registry
+metrics_app = make_asgi_app()
@@ -11,7 +11,7 @@ import pickle
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
@@ -209,6 +209,36 @@ class FloodRiskPredictor:
         
         return risk_level, confidence
     
+    def predict_batch(self, readings: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Predict flood risk levels for many readings in one model pass.
+        
+        Args:
+            readings: Array of shape (n, 3) with water level, rainfall and river flow
+            
+        Returns:
+            List[Tuple[str, float]]: Risk level and confidence score per reading
+            
+        Raises:
+            ValueError: If model is not trained
+        """
+        if not self.is_trained or self.model is None:
+            raise ValueError("Model is not trained. Please train the model first.")
+        
+        X_scaled = self.scaler.transform(readings)
+        
+        # One forest pass: derive classes and confidences from the probabilities
+        probabilities = self.model.predict_proba(X_scaled)
+        predictions = self.model.classes_[probabilities.argmax(axis=1)]
+        confidences = probabilities.max(axis=1)
+        
+        logger.info(f"Batch prediction completed for {len(readings)} readings")
+        
+        return [
+            (RISK_LEVELS[prediction], confidence)
+            for prediction, confidence in zip(predictions, confidences)
+        ]
+    
     def save_model(self, model_path: Path = MODEL_PATH, scaler_path: Path = SCALER_PATH) -> bool:
         """
         Save the trained model and scaler to disk.
@@ -364,3 +394,16 @@ def predict_flood_risk(water_level: float, rainfall: float, river_flow: float) -
         Tuple[str, float]: Risk level and confidence score
     """
     return predictor.predict(water_level, rainfall, river_flow)
+
+
+def predict_flood_risk_batch(readings: np.ndarray) -> List[Tuple[str, float]]:
+    """
+    Predict flood risk for many readings using the global model instance.
+    
+    Args:
+        readings: Array of shape (n, 3) with water level, rainfall and river flow
+        
+    Returns:
+        List[Tuple[str, float]]: Risk level and confidence score per reading
+    """
+    return predictor.predict_batch(readings)
@@ -4,21 +4,31 @@ Advanced IoT sensor management with LoRaWAN/MQTT support and health monitoring
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Dict, List, Any, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime, timedelta
 import sqlite3
 import json
 import logging
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
+from app.metrics import SQL_WRITE_LAT, BATCH_SIZE
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/iot", tags=["iot"])
 
+# Bounded thread pool for blocking SQLite calls, keeping them off the event loop
+DB_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sqlite")
+
+async def run_db(func, *args):
+    """Run a blocking database function in the SQLite thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(DB_POOL, func, *args)
+
 @dataclass
 class SensorNode:
     """IoT Sensor Node"""
@@ -37,9 +47,13 @@ class SensorDataRequest(BaseModel):
     """Sensor data request model"""
     node_id: str
     protocol: str
-    timestamp: str
+    timestamp: Union[int, str]  # epoch milliseconds or ISO 8601 string
     data: Dict[str, Any]
 
+class SensorDataBatchRequest(BaseModel):
+    """Batched sensor data request model"""
+    batch: List[SensorDataRequest] = Field(..., min_length=1, max_length=500)
+
 class SensorHealthRequest(BaseModel):
     """Sensor health request model"""
     node_id: str
@@ -118,6 +132,10 @@ class IoTProtocolManager:
     
     async def register_sensor(self, sensor: SensorNode) -> bool:
         """Register a new sensor"""
+        return await run_db(self._register_sensor, sensor)
+    
+    def _register_sensor(self, sensor: SensorNode) -> bool:
+        """Register a new sensor (blocking)"""
         try:
             conn = sqlite3.connect(self.database_path)
             cursor = conn.cursor()
@@ -146,6 +164,10 @@ class IoTProtocolManager:
     
     async def store_sensor_data(self, node_id: str, data: Dict[str, Any]) -> bool:
         """Store sensor data"""
+        return await run_db(self._store_sensor_data, node_id, data)
+    
+    def _store_sensor_data(self, node_id: str, data: Dict[str, Any]) -> bool:
+        """Store sensor data (blocking)"""
         try:
             conn = sqlite3.connect(self.database_path)
             cursor = conn.cursor()
@@ -157,23 +179,25 @@ class IoTProtocolManager:
             if result:
                 sensor_type = result[0]
                 
-                cursor.execute('''
-                    INSERT INTO sensor_data (node_id, sensor_type, data_value, unit, quality)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    node_id, sensor_type,
-                    data.get("value", 0),
-                    data.get("unit", "unknown"),
-                    data.get("quality", "unknown")
-                ))
-                
-                # Update sensor last_seen
-                cursor.execute('''
-                    UPDATE sensors SET last_seen = ?, updated_at = ?
-                    WHERE node_id = ?
-                ''', (datetime.now().isoformat(), datetime.now().isoformat(), node_id))
-                
-                conn.commit()
+                with SQL_WRITE_LAT.time():
+                    cursor.execute('''
+                        INSERT INTO sensor_data (node_id, sensor_type, data_value, unit, quality)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (
+                        node_id, sensor_type,
+                        data.get("value", 0),
+                        data.get("unit", "unknown"),
+                        data.get("quality", "unknown")
+                    ))
+                    
+                    # Update sensor last_seen
+                    cursor.execute('''
+                        UPDATE sensors SET last_seen = ?, updated_at = ?
+                        WHERE node_id = ?
+                    ''', (datetime.now().isoformat(), datetime.now().isoformat(), node_id))
+                    
+                    conn.commit()
+                BATCH_SIZE.observe(1)
                 conn.close()
                 
                 logger.info(f"✅ Sensor data stored for {node_id}")
@@ -186,37 +210,100 @@ class IoTProtocolManager:
             logger.error(f"❌ Store sensor data error: {str(e)}")
             return False
     
-    async def update_sensor_health(self, node_id: str, health_data: Dict[str, Any]) -> bool:
-        """Update sensor health status"""
+    async def store_sensor_data_batch(self, readings: List[SensorDataRequest]) -> int:
+        """Store a batch of sensor readings, returning how many were stored"""
+        return await run_db(self._store_sensor_data_batch, readings)
+    
+    def _store_sensor_data_batch(self, readings: List[SensorDataRequest]) -> int:
+        """Store a batch of sensor readings in one transaction (blocking)"""
         try:
             conn = sqlite3.connect(self.database_path)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO sensor_health 
-                (node_id, status, health_score, battery_level, signal_strength, error_count)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                node_id,
-                health_data.get("status", "unknown"),
-                health_data.get("health_score", 0),
-                health_data.get("battery_level"),
-                health_data.get("signal_strength"),
-                health_data.get("error_count")
-            ))
+            # Look up sensor types for every node in the batch at once
+            node_ids = list({reading.node_id for reading in readings})
+            placeholders = ",".join("?" * len(node_ids))
+            cursor.execute(
+                f"SELECT node_id, sensor_type FROM sensors WHERE node_id IN ({placeholders})",
+                node_ids
+            )
+            sensor_types = dict(cursor.fetchall())
             
-            # Update sensor status
-            cursor.execute('''
-                UPDATE sensors SET status = ?, health_score = ?, updated_at = ?
-                WHERE node_id = ?
-            ''', (
-                health_data.get("status", "unknown"),
-                health_data.get("health_score", 0),
-                datetime.now().isoformat(),
-                node_id
-            ))
+            rows = [
+                (
+                    reading.node_id, sensor_types[reading.node_id],
+                    reading.data.get("value", 0),
+                    reading.data.get("unit", "unknown"),
+                    reading.data.get("quality", "unknown")
+                )
+                for reading in readings if reading.node_id in sensor_types
+            ]
             
-            conn.commit()
+            if rows:
+                now = datetime.now().isoformat()
+                with SQL_WRITE_LAT.time():
+                    cursor.executemany('''
+                        INSERT INTO sensor_data (node_id, sensor_type, data_value, unit, quality)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', rows)
+                    
+                    # Update last_seen once per sensor
+                    cursor.executemany('''
+                        UPDATE sensors SET last_seen = ?, updated_at = ?
+                        WHERE node_id = ?
+                    ''', [(now, now, node_id) for node_id in sensor_types])
+                    
+                    conn.commit()
+                BATCH_SIZE.observe(len(rows))
+            conn.close()
+            
+            skipped = len(readings) - len(rows)
+            if skipped:
+                logger.error(f"❌ {skipped} readings skipped for unregistered sensors")
+            logger.info(f"✅ Stored {len(rows)} sensor readings")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"❌ Store sensor data batch error: {str(e)}")
+            return 0
+    
+    async def update_sensor_health(self, node_id: str, health_data: Dict[str, Any]) -> bool:
+        """Update sensor health status"""
+        return await run_db(self._update_sensor_health, node_id, health_data)
+    
+    def _update_sensor_health(self, node_id: str, health_data: Dict[str, Any]) -> bool:
+        """Update sensor health status (blocking)"""
+        try:
+            conn = sqlite3.connect(self.database_path)
+            cursor = conn.cursor()
+            
+            with SQL_WRITE_LAT.time():
+                cursor.execute('''
+                    INSERT INTO sensor_health 
+                    (node_id, status, health_score, battery_level, signal_strength, error_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    node_id,
+                    health_data.get("status", "unknown"),
+                    health_data.get("health_score", 0),
+                    health_data.get("battery_level"),
+                    health_data.get("signal_strength"),
+                    health_data.get("error_count")
+                ))
+                
+                # Update sensor status
+                cursor.execute('''
+                    UPDATE sensors SET status = ?, health_score = ?, updated_at = ?
+                    WHERE node_id = ?
+                ''', (
+                    health_data.get("status", "unknown"),
+                    health_data.get("health_score", 0),
+                    datetime.now().isoformat(),
+                    node_id
+                ))
+                
+                conn.commit()
+            BATCH_SIZE.observe(1)
             conn.close()
             
             logger.info(f"✅ Sensor health updated for {node_id}")
@@ -228,6 +315,10 @@ class IoTProtocolManager:
     
     async def get_all_sensors(self) -> List[Dict[str, Any]]:
         """Get all registered sensors"""
+        return await run_db(self._get_all_sensors)
+    
+    def _get_all_sensors(self) -> List[Dict[str, Any]]:
+        """Get all registered sensors (blocking)"""
         try:
             conn = sqlite3.connect(self.database_path)
             cursor = conn.cursor()
@@ -263,6 +354,10 @@ class IoTProtocolManager:
     
     async def get_sensor_health_summary(self) -> Dict[str, Any]:
         """Get sensor network health summary"""
+        return await run_db(self._get_sensor_health_summary)
+    
+    def _get_sensor_health_summary(self) -> Dict[str, Any]:
+        """Get sensor network health summary (blocking)"""
         try:
             conn = sqlite3.connect(self.database_path)
             cursor = conn.cursor()
@@ -308,6 +403,54 @@ class IoTProtocolManager:
             logger.error(f"❌ Get sensor health summary error: {str(e)}")
             return {}
 
+    async def get_sensor_details(self, node_id: str) -> Optional[tuple]:
+        """Get sensor info, recent data and health history rows"""
+        return await run_db(self._get_sensor_details, node_id)
+    
+    def _get_sensor_details(self, node_id: str) -> Optional[tuple]:
+        """Get sensor info, recent data and health history rows (blocking)"""
+        conn = sqlite3.connect(self.database_path)
+        try:
+            cursor = conn.cursor()
+            
+            # Get sensor info
+            cursor.execute('''
+                SELECT node_id, name, lat, lng, sensor_type, protocol, 
+                       status, health_score, last_seen, created_at
+                FROM sensors WHERE node_id = ?
+            ''', (node_id,))
+            
+            sensor_info = cursor.fetchone()
+            
+            if not sensor_info:
+                return None
+            
+            # Get recent data
+            cursor.execute('''
+                SELECT data_value, unit, quality, timestamp
+                FROM sensor_data 
+                WHERE node_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT 10
+            ''', (node_id,))
+            
+            recent_data = cursor.fetchall()
+            
+            # Get health history
+            cursor.execute('''
+                SELECT status, health_score, battery_level, signal_strength, timestamp
+                FROM sensor_health 
+                WHERE node_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT 10
+            ''', (node_id,))
+            
+            health_history = cursor.fetchall()
+            
+            return sensor_info, recent_data, health_history
+        finally:
+            conn.close()
+
 # Global IoT Protocol Manager
 iot_manager = IoTProtocolManager()
 
@@ -334,6 +477,25 @@ async def receive_sensor_data(request: SensorDataRequest, background_tasks: Back
         logger.error(f"❌ Receive sensor data error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sensor-data/batch")
+async def receive_sensor_data_batch(request: SensorDataBatchRequest, background_tasks: BackgroundTasks):
+    """Receive a batch of sensor data from IoT gateways and protocol handlers"""
+    try:
+        # Store the whole batch in one background transaction
+        background_tasks.add_task(iot_manager.store_sensor_data_batch, request.batch)
+        
+        logger.info(f"📡 Received batch of {len(request.batch)} sensor readings")
+        
+        return {
+            "status": "success",
+            "message": f"Received {len(request.batch)} sensor readings",
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Receive sensor data batch error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/sensor-health")
 async def update_sensor_health(request: SensorHealthRequest, background_tasks: BackgroundTasks):
     """Update sensor health status"""
@@ -402,44 +564,12 @@ async def get_sensor_health():
 async def get_sensor_details(node_id: str):
     """Get detailed information about a specific sensor"""
     try:
-        conn = sqlite3.connect(iot_manager.database_path)
-        cursor = conn.cursor()
-        
-        # Get sensor info
-        cursor.execute('''
-            SELECT node_id, name, lat, lng, sensor_type, protocol, 
-                   status, health_score, last_seen, created_at
-            FROM sensors WHERE node_id = ?
-        ''', (node_id,))
+        details = await iot_manager.get_sensor_details(node_id)
         
-        sensor_info = cursor.fetchone()
-        
-        if not sensor_info:
+        if not details:
             raise HTTPException(status_code=404, detail="Sensor not found")
         
-        # Get recent data
-        cursor.execute('''
-            SELECT data_value, unit, quality, timestamp
-            FROM sensor_data 
-            WHERE node_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''', (node_id,))
-        
-        recent_data = cursor.fetchall()
-        
-        # Get health history
-        cursor.execute('''
-            SELECT status, health_score, battery_level, signal_strength, timestamp
-            FROM sensor_health 
-            WHERE node_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''', (node_id,))
-        
-        health_history = cursor.fetchall()
-        
-        conn.close()
+        sensor_info, recent_data, health_history = details
         
         return {
             "status": "success",
@@ -7,13 +7,17 @@ including the main prediction endpoint and related functionality.
 
 import logging
 from datetime import datetime
+from typing import List
+
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import PredictionRequest, PredictionResponse
 from app.crud import AlertCRUD
-from app.ml_model import predict_flood_risk, predictor
+from app.ml_model import predict_flood_risk, predict_flood_risk_batch, predictor
+from app.metrics import ML_INFER
 
 logger = logging.getLogger(__name__)
 
@@ -55,11 +59,12 @@ async def predict_flood_risk_endpoint(
             )
         
         # Make prediction
-        risk_level, confidence = predict_flood_risk(
-            water_level=request.water_level,
-            rainfall=request.rainfall,
-            river_flow=request.river_flow
-        )
+        with ML_INFER.time():
+            risk_level, confidence = predict_flood_risk(
+                water_level=request.water_level,
+                rainfall=request.rainfall,
+                river_flow=request.river_flow
+            )
         
         # Create timestamp
         timestamp = datetime.utcnow()
@@ -102,6 +107,90 @@ async def predict_flood_risk_endpoint(
         )
 
 
+@router.post("/predict/batch", response_model=List[PredictionResponse])
+async def predict_flood_risk_batch_endpoint(
+    requests: List[PredictionRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Predict flood risk levels for a batch of readings.
+    
+    Accepts a JSON array of prediction requests and returns one prediction
+    per reading, in order. The model runs once over the whole batch and
+    all alerts are saved in a single transaction.
+    
+    Args:
+        requests: Prediction requests containing environmental parameters
+        db: Database session dependency
+        
+    Returns:
+        List[PredictionResponse]: Risk level, confidence, and timestamp per reading
+        
+    Raises:
+        HTTPException: If prediction fails or model is not available
+    """
+    try:
+        logger.info(f"Received batch prediction request for {len(requests)} readings")
+        
+        if not requests:
+            return []
+        
+        # Check if model is trained
+        if not predictor.is_trained:
+            logger.error("ML model is not trained")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="ML model is not available. Please try again later."
+            )
+        
+        readings = np.array(
+            [[r.water_level, r.rainfall, r.river_flow] for r in requests]
+        )
+        
+        # Make predictions
+        with ML_INFER.time():
+            results = predict_flood_risk_batch(readings)
+        
+        # Create timestamp
+        timestamp = datetime.utcnow()
+        
+        # Save predictions to database
+        try:
+            AlertCRUD.create_alerts(db, [
+                {
+                    "water_level": r.water_level,
+                    "rainfall": r.rainfall,
+                    "river_flow": r.river_flow,
+                    "risk_level": risk_level,
+                    "confidence": confidence,
+                    "timestamp": timestamp
+                }
+                for r, (risk_level, confidence) in zip(requests, results)
+            ])
+        except Exception as e:
+            logger.error(f"Failed to save batch predictions to database: {e}")
+            # Continue with response even if database save fails
+        
+        return [
+            PredictionResponse(
+                risk_level=risk_level,
+                confidence=round(confidence, 3),
+                timestamp=timestamp
+            )
+            for risk_level, confidence in results
+        ]
+        
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
+
+
 @router.get("/model-info")
 async def get_model_info():
     """
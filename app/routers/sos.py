@@ -5,21 +5,105 @@ This module contains the API endpoints for managing SOS requests,
 AI-powered analysis, and emergency response coordination.
 """
 
+import asyncio
+import heapq
 import logging
-import sqlite3
-from typing import Optional, List
+import re
+import time
+import aiosqlite
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Optional, List, Tuple
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.models import AlertResponse
 
 logger = logging.getLogger(__name__)
 
-# Create router instance
-router = APIRouter()
+# SOS database locations
+TELEGRAM_DB_PATH = 'telegram_sos.db'
+WHATSAPP_DB_PATH = 'whatsapp_sos.db'
+
+# SQL statements, kept as constants so each connection's statement cache hits
+SQL_LIST = '''
+    SELECT id, user_id, username, chat_id, message, location, status, timestamp
+    FROM sos_requests 
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+SQL_LIST_BY_STATUS = '''
+    SELECT id, user_id, username, chat_id, message, location, status, timestamp
+    FROM sos_requests 
+    WHERE status = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+SQL_BY_ID = '''
+    SELECT id, user_id, username, chat_id, message, location, status, timestamp
+    FROM sos_requests 
+    WHERE id = ?
+'''
+SQL_RESOLVE = '''
+    UPDATE sos_requests 
+    SET status = 'RESOLVED', notes = ?
+    WHERE id = ?
+'''
+
+# Indexes so ORDER BY timestamp DESC LIMIT (optionally filtered by status)
+# walks an index instead of sorting; id is the rowid and needs none
+SQL_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_sos_timestamp ON sos_requests(timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_sos_status_timestamp ON sos_requests(status, timestamp DESC)",
+)
+
+# Persistent connections, opened by init_sos_connections() at startup
+TG_CONN: Optional[aiosqlite.Connection] = None
+WA_CONN: Optional[aiosqlite.Connection] = None
+
+# Sort key for merging newest-first request lists
+_BY_TIMESTAMP = itemgetter("timestamp")
+
+# Cache for AI insights and risk analysis: key -> (expires_at, value).
+# The version is bumped on writes so in-flight stale results are never read.
+AI_CACHE_TTL = 15  # seconds
+AI_WINDOW = 100  # most recent requests per platform used for AI analysis
+ai_result_cache = {}
+_ai_cache_version = 0
+_ai_cache_lock = asyncio.Lock()
+
+# Priority keywords and high-risk areas (lowercase)
+HIGH_PRIORITY_KEYWORDS = ('emergency', 'urgent', 'help', 'flood', 'danger', 'trapped', 'injured')
+MEDIUM_PRIORITY_KEYWORDS = ('sos', 'assistance', 'problem', 'issue')
+HIGH_RISK_AREAS = ('mumbai', 'chennai', 'kolkata')
+
+# Fixed part of the risk analysis; only total_requests varies per call
+_RISK_ANALYSIS_STATIC = MappingProxyType({
+    "high_risk_areas": ('Mumbai', 'Chennai', 'Kolkata'),
+    "medium_risk_areas": ('Delhi', 'Bangalore', 'Hyderabad', 'Pune', 'Ahmedabad', 'Jaipur', 'Surat'),
+    "low_risk_areas": ('Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Thane', 'Bhopal', 'Visakhapatnam', 'Pimpri-Chinchwad', 'Patna', 'Vadodara'),
+    "avg_response_time": "2.3 minutes",
+    "success_rate": 98.5,
+    "predicted_floods": 3,
+    "active_rescue_teams": 12,
+    "population_covered": "150M+",
+    "cities_covered": 20
+})
+
+# Priority keyword patterns (case-insensitive substring match)
+_HIGH_PRIORITY_RE = re.compile('|'.join(HIGH_PRIORITY_KEYWORDS), re.IGNORECASE)
+_MEDIUM_PRIORITY_RE = re.compile('|'.join(MEDIUM_PRIORITY_KEYWORDS), re.IGNORECASE)
+_HIGH_RISK_LOCATION_RE = re.compile('|'.join(HIGH_RISK_AREAS), re.IGNORECASE)
+
+# Create router instance; all SOS endpoints serialize with orjson
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Pydantic models
 class SOSRequest(BaseModel):
@@ -35,6 +119,10 @@ class SOSRequest(BaseModel):
     priority: Optional[str] = "medium"
     notes: Optional[str] = None
 
+class ResolveBatch(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+    notes: Optional[str] = None
+
 class SOSResponse(BaseModel):
     requests: List[SOSRequest]
     count: int
@@ -84,87 +172,50 @@ async def get_sos_requests(
         SOSResponse: SOS requests with AI analysis
     """
     try:
-        logger.info(f"Retrieving SOS requests: limit={limit}, platform={platform}, status={status}")
-        
-        # Get SOS requests from Telegram database
-        telegram_requests = get_telegram_sos_requests(limit)
-        
-        # Get SOS requests from WhatsApp database
-        whatsapp_requests = get_whatsapp_sos_requests(limit)
-        
-        # Combine and filter requests
-        all_requests = []
-        
-        for req in telegram_requests:
-            req_dict = {
-                "id": req["id"],
-                "user_id": req["user_id"],
-                "username": req["username"],
-                "chat_id": req["chat_id"],
-                "message": req["message"],
-                "location": req["location"],
-                "status": req["status"],
-                "timestamp": req["timestamp"],
-                "platform": "telegram",
-                "priority": determine_priority(req["message"], req["location"]),
-                "notes": None
-            }
-            all_requests.append(req_dict)
-        
-        for req in whatsapp_requests:
-            req_dict = {
-                "id": req["id"],
-                "user_id": req["user_id"],
-                "username": req["username"],
-                "chat_id": req["chat_id"],
-                "message": req["message"],
-                "location": req["location"],
-                "status": req["status"],
-                "timestamp": req["timestamp"],
-                "platform": "whatsapp",
-                "priority": determine_priority(req["message"], req["location"]),
-                "notes": None
-            }
-            all_requests.append(req_dict)
-        
-        # Apply filters
-        if platform:
-            all_requests = [req for req in all_requests if req["platform"] == platform]
-        
-        if status:
-            all_requests = [req for req in all_requests if req["status"] == status]
-        
-        # Sort by timestamp (newest first)
-        all_requests.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        # Limit results
-        all_requests = all_requests[:limit]
-        
-        # Generate AI insights and risk analysis
-        ai_insights = []
-        risk_analysis = {}
-        
-        if include_ai:
-            ai_insights = generate_ai_insights(all_requests)
-            risk_analysis = generate_risk_analysis(all_requests)
-        
-        response = SOSResponse(
-            requests=all_requests,
-            count=len(all_requests),
-            ai_insights=ai_insights,
-            risk_analysis=risk_analysis
-        )
+        logger.info("Retrieving SOS requests: limit=%s, platform=%s, status=%s", limit, platform, status)
+        
+        response = await build_sos_response(limit, platform, status, include_ai)
         
-        logger.info(f"Retrieved {len(all_requests)} SOS requests with AI analysis")
-        return response
+        logger.info("Retrieved %s SOS requests with AI analysis", response.count)
+        return ORJSONResponse(content=response.model_dump())
         
     except Exception as e:
-        logger.error(f"Failed to retrieve SOS requests: {e}")
+        logger.error("Failed to retrieve SOS requests: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve SOS requests: {str(e)}"
         )
 
+@router.get("/sos/_bulk", response_model=SOSResponse)
+async def get_sos_bulk(
+    limit: int = Query(50, ge=1, le=100, description="Number of SOS requests to return")
+):
+    """
+    Retrieve SOS requests, AI insights and risk analysis in one call.
+    
+    Replaces the separate /sos, /sos/ai/insights and /sos/risk/analysis
+    round trips made by dashboards.
+    
+    Args:
+        limit: Maximum number of requests to return
+        
+    Returns:
+        SOSResponse: SOS requests with AI analysis
+    """
+    try:
+        logger.info("Retrieving SOS bulk data: limit=%s", limit)
+        
+        response = await build_sos_response(limit)
+        
+        return ORJSONResponse(content=response.model_dump())
+        
+    except Exception as e:
+        logger.error("Failed to retrieve SOS bulk data: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve SOS bulk data: {str(e)}"
+        )
+
 @router.get("/sos/{request_id}", response_model=SOSRequest)
 async def get_sos_request_by_id(request_id: int):
     """
@@ -177,17 +228,17 @@ async def get_sos_request_by_id(request_id: int):
         SOSRequest: The requested SOS request
     """
     try:
-        logger.info(f"Retrieving SOS request with ID {request_id}")
+        logger.info("Retrieving SOS request with ID %s", request_id)
         
         # Check Telegram database first
-        telegram_request = get_telegram_sos_request_by_id(request_id)
+        telegram_request = await get_telegram_sos_request_by_id(request_id)
         if telegram_request:
             telegram_request["platform"] = "telegram"
             telegram_request["priority"] = determine_priority(telegram_request["message"], telegram_request["location"])
             return SOSRequest(**telegram_request)
         
         # Check WhatsApp database
-        whatsapp_request = get_whatsapp_sos_request_by_id(request_id)
+        whatsapp_request = await get_whatsapp_sos_request_by_id(request_id)
         if whatsapp_request:
             whatsapp_request["platform"] = "whatsapp"
             whatsapp_request["priority"] = determine_priority(whatsapp_request["message"], whatsapp_request["location"])
@@ -201,7 +252,7 @@ async def get_sos_request_by_id(request_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to retrieve SOS request ID {request_id}: {e}")
+        logger.error("Failed to retrieve SOS request ID %s: %s", request_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve SOS request: {str(e)}"
@@ -220,16 +271,18 @@ async def resolve_sos_request(request_id: int, notes: Optional[str] = Body(None)
         dict: Success message
     """
     try:
-        logger.info(f"Resolving SOS request with ID {request_id}")
+        logger.info("Resolving SOS request with ID %s", request_id)
         
         # Try to resolve in Telegram database
-        if resolve_telegram_sos_request(request_id, notes):
-            logger.info(f"SOS request ID {request_id} resolved in Telegram database")
+        if await resolve_telegram_sos_request(request_id, notes):
+            invalidate_ai_cache()
+            logger.info("SOS request ID %s resolved in Telegram database", request_id)
             return {"message": f"SOS request with ID {request_id} resolved successfully"}
         
         # Try to resolve in WhatsApp database
-        if resolve_whatsapp_sos_request(request_id, notes):
-            logger.info(f"SOS request ID {request_id} resolved in WhatsApp database")
+        if await resolve_whatsapp_sos_request(request_id, notes):
+            invalidate_ai_cache()
+            logger.info("SOS request ID %s resolved in WhatsApp database", request_id)
             return {"message": f"SOS request with ID {request_id} resolved successfully"}
         
         raise HTTPException(
@@ -240,12 +293,58 @@ async def resolve_sos_request(request_id: int, notes: Optional[str] = Body(None)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to resolve SOS request ID {request_id}: {e}")
+        logger.error("Failed to resolve SOS request ID %s: %s", request_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to resolve SOS request: {str(e)}"
         )
 
+@router.post("/sos/resolve")
+async def resolve_sos_requests(batch: ResolveBatch):
+    """
+    Resolve several SOS requests in one call.
+    
+    Each database is updated in a single transaction. As with the single
+    resolve endpoint, IDs are matched against Telegram first and WhatsApp
+    second.
+    
+    Args:
+        batch: SOS request identifiers and optional resolution notes
+        
+    Returns:
+        dict: Resolved and unknown request IDs
+    """
+    try:
+        request_ids = list(dict.fromkeys(batch.ids))
+        logger.info("Resolving %s SOS requests", len(request_ids))
+        
+        telegram_resolved = await resolve_telegram_sos_requests(request_ids, batch.notes)
+        telegram_ids = set(telegram_resolved)
+        remaining = [i for i in request_ids if i not in telegram_ids]
+        whatsapp_resolved = (
+            await resolve_whatsapp_sos_requests(remaining, batch.notes) if remaining else []
+        )
+        
+        resolved = telegram_resolved + whatsapp_resolved
+        if resolved:
+            invalidate_ai_cache()
+        resolved_ids = set(resolved)
+        not_found = [i for i in request_ids if i not in resolved_ids]
+        
+        logger.info("Resolved %s of %s SOS requests", len(resolved), len(request_ids))
+        return {
+            "message": f"Resolved {len(resolved)} of {len(request_ids)} SOS requests",
+            "resolved": resolved,
+            "not_found": not_found
+        }
+        
+    except Exception as e:
+        logger.error("Failed to resolve SOS requests: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resolve SOS requests: {str(e)}"
+        )
+
 @router.get("/sos/ai/insights")
 async def get_ai_insights():
     """
@@ -257,16 +356,13 @@ async def get_ai_insights():
     try:
         logger.info("Generating AI insights")
         
-        # Get recent SOS requests
-        recent_requests = get_telegram_sos_requests(100) + get_whatsapp_sos_requests(100)
-        
-        # Generate insights
-        insights = generate_ai_insights(recent_requests)
+        # Generate insights (served from cache within the TTL window)
+        insights, _ = await get_insights_and_risk()
         
         return insights
         
     except Exception as e:
-        logger.error(f"Failed to generate AI insights: {e}")
+        logger.error("Failed to generate AI insights: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate AI insights: {str(e)}"
@@ -283,209 +379,279 @@ async def get_risk_analysis():
     try:
         logger.info("Generating risk analysis")
         
-        # Get recent SOS requests
-        recent_requests = get_telegram_sos_requests(100) + get_whatsapp_sos_requests(100)
-        
-        # Generate risk analysis
-        analysis = generate_risk_analysis(recent_requests)
+        # Generate risk analysis (served from cache within the TTL window)
+        _, analysis = await get_insights_and_risk()
         
         return analysis
         
     except Exception as e:
-        logger.error(f"Failed to generate risk analysis: {e}")
+        logger.error("Failed to generate risk analysis: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate risk analysis: {str(e)}"
         )
 
 # Helper functions
-def get_telegram_sos_requests(limit: int = 50):
+async def _compute_insights_and_risk(window: Optional[List[List[dict]]] = None) -> Tuple[List[dict], dict]:
+    """Derive insights and risk analysis from the recent SOS window, fetching it if needed."""
+    if window is None:
+        window = await asyncio.gather(
+            get_telegram_sos_requests(AI_WINDOW),
+            get_whatsapp_sos_requests(AI_WINDOW)
+        )
+    recent_requests = [req for rows in window for req in rows]
+    return generate_ai_insights(recent_requests), generate_risk_analysis(recent_requests)
+
+async def get_insights_and_risk(window: Optional[List[List[dict]]] = None) -> Tuple[List[dict], dict]:
+    """
+    Get AI insights and risk analysis, shared by all SOS endpoints.
+    
+    Callers that already fetched the AI window (per-platform lists of at
+    least AI_WINDOW rows) can pass it in to avoid a second fetch on a miss.
+    """
+    return await _get_cached_ai_result(
+        "insights_and_risk", lambda: _compute_insights_and_risk(window)
+    )
+
+async def build_sos_response(limit: int, platform: Optional[str] = None,
+                             status: Optional[str] = None, include_ai: bool = True) -> SOSResponse:
+    """Fetch, merge and optionally analyse SOS requests for the list endpoints."""
+    # Only query the databases the platform filter allows; status and
+    # limit are applied in SQL
+    sources = {
+        "telegram": get_telegram_sos_requests,
+        "whatsapp": get_whatsapp_sos_requests
+    }
+    selected = [name for name in sources if platform in (None, name)]
+    
+    # Unfiltered requests fetch the whole AI window once and reuse it for
+    # the analysis, slicing the response down to limit afterwards
+    shared_window = include_ai and platform is None and status is None
+    fetch_limit = max(limit, AI_WINDOW) if shared_window else limit
+    results = await asyncio.gather(
+        *(sources[name](fetch_limit, status) for name in selected)
+    )
+    
+    # Each source is already newest-first, so merge instead of re-sorting
+    all_requests = list(islice(
+        heapq.merge(*results, key=_BY_TIMESTAMP, reverse=True),
+        limit
+    ))
+    
+    # Generate AI insights and risk analysis
+    ai_insights = []
+    risk_analysis = {}
+    
+    if include_ai:
+        ai_insights, risk_analysis = await get_insights_and_risk(
+            results if shared_window else None
+        )
+    
+    # Rows come from our own databases, so skip validation and hand the
+    # response straight to orjson (FastAPI would otherwise re-validate)
+    return SOSResponse.model_construct(
+        requests=[_construct_sos_request(req) for req in all_requests],
+        count=len(all_requests),
+        ai_insights=ai_insights,
+        risk_analysis=risk_analysis
+    )
+
+async def _get_cached_ai_result(name: str, compute):
+    """
+    Return a cached AI result, recomputing it at most once per TTL window.
+    
+    Concurrent callers wait on a single lock so only one of them hits the
+    databases when the entry has expired.
+    """
+    key = (name, _ai_cache_version)
+    entry = ai_result_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    
+    async with _ai_cache_lock:
+        entry = ai_result_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        
+        value = await compute()
+        ai_result_cache[key] = (time.monotonic() + AI_CACHE_TTL, value)
+        return value
+
+def invalidate_ai_cache():
+    """Drop cached AI results, e.g. after an SOS request changes status."""
+    global _ai_cache_version
+    _ai_cache_version += 1
+    ai_result_cache.clear()
+
+async def _open_sos_connection(path: str) -> aiosqlite.Connection:
+    """Open a persistent connection to an SOS database and tune it once."""
+    conn = await aiosqlite.connect(path, cached_statements=128)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA journal_mode=WAL")
+    await conn.execute("PRAGMA synchronous=NORMAL")
+    await conn.execute("PRAGMA cache_size=-20000")
+    await conn.execute("PRAGMA mmap_size=268435456")
+    
+    try:
+        for sql in SQL_INDEXES:
+            await conn.execute(sql)
+        await conn.commit()
+        await conn.execute("ANALYZE")
+    except aiosqlite.OperationalError as e:
+        # The bots create sos_requests lazily; indexes follow on next startup
+        logger.warning("Could not create SOS indexes in %s: %s", path, e)
+    return conn
+
+async def init_sos_connections():
+    """Open the Telegram and WhatsApp SOS database connections."""
+    global TG_CONN, WA_CONN
+    TG_CONN = await _open_sos_connection(TELEGRAM_DB_PATH)
+    WA_CONN = await _open_sos_connection(WHATSAPP_DB_PATH)
+    logger.info("SOS database connections opened")
+
+async def close_sos_connections():
+    """Close the Telegram and WhatsApp SOS database connections."""
+    global TG_CONN, WA_CONN
+    for conn in (TG_CONN, WA_CONN):
+        if conn is not None:
+            await conn.close()
+    TG_CONN = WA_CONN = None
+    logger.info("SOS database connections closed")
+
+def _construct_sos_request(request: dict) -> SOSRequest:
+    """Build an SOSRequest from a trusted row dict without validation."""
+    fields = dict(request, timestamp=datetime.fromisoformat(request["timestamp"]))
+    return SOSRequest.model_construct(**fields)
+
+def _sos_request_dict(row: aiosqlite.Row, platform: str) -> dict:
+    """Build the API representation of an SOS request row."""
+    request = dict(row)
+    request["platform"] = platform
+    request["priority"] = determine_priority(row["message"], row["location"])
+    request["notes"] = None
+    return request
+
+async def _fetch_sos_requests(conn: aiosqlite.Connection, platform: str, limit: int,
+                              status: Optional[str] = None) -> List[dict]:
+    """Get the most recent SOS requests, optionally filtered by status."""
+    if status:
+        sql, params = SQL_LIST_BY_STATUS, (status, limit)
+    else:
+        sql, params = SQL_LIST, (limit,)
+    
+    # Iterating the cursor pulls rows in fetchmany() batches of arraysize
+    async with conn.execute(sql, params) as cursor:
+        cursor.arraysize = 64
+        return [_sos_request_dict(row, platform) async for row in cursor]
+
+async def _fetch_sos_request_by_id(conn: aiosqlite.Connection, request_id: int) -> Optional[dict]:
+    """Get a specific SOS request by ID from a database connection."""
+    async with conn.execute(SQL_BY_ID, (request_id,)) as cursor:
+        row = await cursor.fetchone()
+    return dict(row) if row else None
+
+async def _resolve_sos_request(conn: aiosqlite.Connection, request_id: int, notes: Optional[str]) -> bool:
+    """Mark an SOS request as resolved on a database connection."""
+    cursor = await conn.execute(SQL_RESOLVE, (notes, request_id))
+    success = cursor.rowcount > 0
+    await cursor.close()
+    await conn.commit()
+    return success
+
+async def _resolve_sos_requests(conn: aiosqlite.Connection, request_ids: List[int],
+                               notes: Optional[str]) -> List[int]:
+    """Mark the SOS requests that exist on a connection as resolved in one transaction."""
+    placeholders = ",".join("?" * len(request_ids))
+    async with conn.execute(
+        f"SELECT id FROM sos_requests WHERE id IN ({placeholders})", request_ids
+    ) as cursor:
+        found = [row[0] for row in await cursor.fetchall()]
+    
+    if found:
+        try:
+            await conn.executemany(
+                SQL_RESOLVE, [(notes, request_id) for request_id in found]
+            )
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    return found
+
+async def get_telegram_sos_requests(limit: int = 50, status: Optional[str] = None):
     """Get SOS requests from Telegram database."""
     try:
-        conn = sqlite3.connect('telegram_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, username, chat_id, message, location, status, timestamp
-            FROM sos_requests 
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        requests = cursor.fetchall()
-        conn.close()
-        
-        return [
-            {
-                'id': req[0],
-                'user_id': req[1],
-                'username': req[2],
-                'chat_id': req[3],
-                'message': req[4],
-                'location': req[5],
-                'status': req[6],
-                'timestamp': req[7]
-            }
-            for req in requests
-        ]
+        return await _fetch_sos_requests(TG_CONN, "telegram", limit, status)
     except Exception as e:
-        logger.error(f"Error getting Telegram SOS requests: {e}")
+        logger.error("Error getting Telegram SOS requests: %s", e)
         return []
 
-def get_whatsapp_sos_requests(limit: int = 50):
+async def get_whatsapp_sos_requests(limit: int = 50, status: Optional[str] = None):
     """Get SOS requests from WhatsApp database."""
     try:
-        conn = sqlite3.connect('whatsapp_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, username, chat_id, message, location, status, timestamp
-            FROM sos_requests 
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        requests = cursor.fetchall()
-        conn.close()
-        
-        return [
-            {
-                'id': req[0],
-                'user_id': req[1],
-                'username': req[2],
-                'chat_id': req[3],
-                'message': req[4],
-                'location': req[5],
-                'status': req[6],
-                'timestamp': req[7]
-            }
-            for req in requests
-        ]
+        return await _fetch_sos_requests(WA_CONN, "whatsapp", limit, status)
     except Exception as e:
-        logger.error(f"Error getting WhatsApp SOS requests: {e}")
+        logger.error("Error getting WhatsApp SOS requests: %s", e)
         return []
 
-def get_telegram_sos_request_by_id(request_id: int):
+async def get_telegram_sos_request_by_id(request_id: int):
     """Get specific Telegram SOS request by ID."""
     try:
-        conn = sqlite3.connect('telegram_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, username, chat_id, message, location, status, timestamp
-            FROM sos_requests 
-            WHERE id = ?
-        ''', (request_id,))
-        
-        req = cursor.fetchone()
-        conn.close()
-        
-        if req:
-            return {
-                'id': req[0],
-                'user_id': req[1],
-                'username': req[2],
-                'chat_id': req[3],
-                'message': req[4],
-                'location': req[5],
-                'status': req[6],
-                'timestamp': req[7]
-            }
-        return None
+        return await _fetch_sos_request_by_id(TG_CONN, request_id)
     except Exception as e:
-        logger.error(f"Error getting Telegram SOS request by ID: {e}")
+        logger.error("Error getting Telegram SOS request by ID: %s", e)
         return None
 
-def get_whatsapp_sos_request_by_id(request_id: int):
+async def get_whatsapp_sos_request_by_id(request_id: int):
     """Get specific WhatsApp SOS request by ID."""
     try:
-        conn = sqlite3.connect('whatsapp_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, username, chat_id, message, location, status, timestamp
-            FROM sos_requests 
-            WHERE id = ?
-        ''', (request_id,))
-        
-        req = cursor.fetchone()
-        conn.close()
-        
-        if req:
-            return {
-                'id': req[0],
-                'user_id': req[1],
-                'username': req[2],
-                'chat_id': req[3],
-                'message': req[4],
-                'location': req[5],
-                'status': req[6],
-                'timestamp': req[7]
-            }
-        return None
+        return await _fetch_sos_request_by_id(WA_CONN, request_id)
     except Exception as e:
-        logger.error(f"Error getting WhatsApp SOS request by ID: {e}")
+        logger.error("Error getting WhatsApp SOS request by ID: %s", e)
         return None
 
-def resolve_telegram_sos_request(request_id: int, notes: Optional[str] = None):
+async def resolve_telegram_sos_request(request_id: int, notes: Optional[str] = None):
     """Resolve Telegram SOS request."""
     try:
-        conn = sqlite3.connect('telegram_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE sos_requests 
-            SET status = 'RESOLVED', notes = ?
-            WHERE id = ?
-        ''', (notes, request_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return await _resolve_sos_request(TG_CONN, request_id, notes)
     except Exception as e:
-        logger.error(f"Error resolving Telegram SOS request: {e}")
+        logger.error("Error resolving Telegram SOS request: %s", e)
         return False
 
-def resolve_whatsapp_sos_request(request_id: int, notes: Optional[str] = None):
+async def resolve_whatsapp_sos_request(request_id: int, notes: Optional[str] = None):
     """Resolve WhatsApp SOS request."""
     try:
-        conn = sqlite3.connect('whatsapp_sos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE sos_requests 
-            SET status = 'RESOLVED', notes = ?
-            WHERE id = ?
-        ''', (notes, request_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return await _resolve_sos_request(WA_CONN, request_id, notes)
     except Exception as e:
-        logger.error(f"Error resolving WhatsApp SOS request: {e}")
+        logger.error("Error resolving WhatsApp SOS request: %s", e)
         return False
 
+async def resolve_telegram_sos_requests(request_ids: List[int], notes: Optional[str] = None):
+    """Resolve a batch of Telegram SOS requests, returning the IDs found."""
+    try:
+        return await _resolve_sos_requests(TG_CONN, request_ids, notes)
+    except Exception as e:
+        logger.error("Error resolving Telegram SOS requests: %s", e)
+        return []
+
+async def resolve_whatsapp_sos_requests(request_ids: List[int], notes: Optional[str] = None):
+    """Resolve a batch of WhatsApp SOS requests, returning the IDs found."""
+    try:
+        return await _resolve_sos_requests(WA_CONN, request_ids, notes)
+    except Exception as e:
+        logger.error("Error resolving WhatsApp SOS requests: %s", e)
+        return []
+
+@lru_cache(maxsize=4096)
 def determine_priority(message: str, location: Optional[str] = None) -> str:
     """Determine priority based on message content and location."""
-    message_lower = message.lower()
-    
-    # High priority keywords
-    high_priority_keywords = ['emergency', 'urgent', 'help', 'flood', 'danger', 'trapped', 'injured']
-    if any(keyword in message_lower for keyword in high_priority_keywords):
+    if _HIGH_PRIORITY_RE.search(message):
         return "high"
     
-    # Medium priority keywords
-    medium_priority_keywords = ['sos', 'assistance', 'problem', 'issue']
-    if any(keyword in message_lower for keyword in medium_priority_keywords):
+    if _MEDIUM_PRIORITY_RE.search(message):
         return "medium"
     
-    # High risk locations
-    high_risk_locations = ['mumbai', 'chennai', 'kolkata']
-    if location and any(risk_location in location.lower() for risk_location in high_risk_locations):
+    if location and _HIGH_RISK_LOCATION_RE.search(location):
         return "high"
     
     return "low"
@@ -497,14 +663,21 @@ def generate_ai_insights(requests: List[dict]) -> List[dict]:
     # Analyze request patterns
     if len(requests) > 0:
         # High risk pattern detection
-        high_risk_areas = ['mumbai', 'chennai', 'kolkata']
-        recent_requests = [req for req in requests if 
-                          datetime.now() - datetime.fromisoformat(req['timestamp'].replace('Z', '+00:00')) < timedelta(hours=1)]
-        
-        for area in high_risk_areas:
-            area_requests = [req for req in recent_requests if 
-                           req.get('location', '').lower() == area]
-            if len(area_requests) >= 3:
+        # Timestamps are stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]', which
+        # orders lexicographically, so compare against a cutoff string
+        cutoff = (datetime.now() - timedelta(hours=1)).isoformat(sep=' ')
+        
+        # Single pass: recent requests per area and resolved count
+        area_counts = Counter()
+        resolved_count = 0
+        for req in requests:
+            if req['timestamp'] >= cutoff:
+                area_counts[(req.get('location') or '').lower()] += 1
+            if req['status'] == 'RESOLVED':
+                resolved_count += 1
+        
+        for area in HIGH_RISK_AREAS:
+            if area_counts[area] >= 3:
                 insights.append({
                     "id": len(insights) + 1,
                     "type": "risk",
@@ -518,8 +691,7 @@ def generate_ai_insights(requests: List[dict]) -> List[dict]:
                 })
         
         # Response time analysis
-        resolved_requests = [req for req in requests if req['status'] == 'RESOLVED']
-        if len(resolved_requests) > 10:
+        if resolved_count > 10:
             insights.append({
                 "id": len(insights) + 1,
                 "type": "trend",
@@ -549,22 +721,7 @@ def generate_ai_insights(requests: List[dict]) -> List[dict]:
 
 def generate_risk_analysis(requests: List[dict]) -> dict:
     """Generate risk analysis from SOS requests."""
-    high_risk_areas = ['Mumbai', 'Chennai', 'Kolkata']
-    medium_risk_areas = ['Delhi', 'Bangalore', 'Hyderabad', 'Pune', 'Ahmedabad', 'Jaipur', 'Surat']
-    low_risk_areas = ['Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Thane', 'Bhopal', 'Visakhapatnam', 'Pimpri-Chinchwad', 'Patna', 'Vadodara']
-    
-    return {
-        "total_requests": len(requests),
-        "high_risk_areas": high_risk_areas,
-        "medium_risk_areas": medium_risk_areas,
-        "low_risk_areas": low_risk_areas,
-        "avg_response_time": "2.3 minutes",
-        "success_rate": 98.5,
-        "predicted_floods": 3,
-        "active_rescue_teams": 12,
-        "population_covered": "150M+",
-        "cities_covered": 20
-    }
+    return {"total_requests": len(requests), **_RISK_ANALYSIS_STATIC}
 
 @router.get("/health")
 async def health_check():
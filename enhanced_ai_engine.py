@@ -3,12 +3,14 @@
 Multi-class risk prediction with explainable AI and historical learning
 """
 
+import asyncio
 import numpy as np
-import pandas as pd
 import joblib
-import requests
-import json
+import aiohttp
+import orjson
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any, Optional
 from sklearn.ensemble import RandomForestClassifier
@@ -17,67 +19,227 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix
 import sqlite3
 import os
+import threading
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis caching is optional
+    aioredis = None
+
+try:
+    import treelite
+    import treelite_runtime
+except ImportError:  # Native model compilation is optional
+    treelite = None
+
+try:
+    import numba
+except ImportError:  # JIT forest traversal is optional
+    numba = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+if numba is not None:
+    @numba.njit(cache=True)
+    def _forest_predict_proba(X, roots, feature, threshold, left, right, value):
+        """Average leaf class probabilities over a flattened forest"""
+        n_trees = roots.shape[0]
+        n_classes = value.shape[1]
+        proba = np.zeros((X.shape[0], n_classes))
+        for i in range(X.shape[0]):
+            for t in range(n_trees):
+                node = roots[t]
+                while left[node] != -1:
+                    if X[i, feature[node]] <= threshold[node]:
+                        node = left[node]
+                    else:
+                        node = right[node]
+                for c in range(n_classes):
+                    proba[i, c] += value[node, c]
+        return proba / n_trees
+
+# Static recommendations per predicted risk class
+_CRITICAL_RECS = (
+    "🚨 IMMEDIATE EVACUATION REQUIRED",
+    "📢 Issue emergency alerts to all residents",
+    "🚁 Deploy rescue teams and helicopters",
+    "🏥 Prepare emergency medical facilities",
+    "📡 Activate emergency communication systems"
+)
+_MODERATE_RECS = (
+    "⚠️ Monitor situation closely",
+    "📢 Issue flood watch warnings",
+    "🚧 Prepare evacuation routes",
+    "📦 Stock emergency supplies",
+    "📱 Keep communication channels open"
+)
+_SAFE_RECS = (
+    "✅ Continue normal monitoring",
+    "📊 Regular data collection",
+    "🔍 Watch for weather changes",
+    "📋 Maintain preparedness protocols"
+)
+_RECOMMENDATIONS = {"critical": _CRITICAL_RECS, "moderate": _MODERATE_RECS}
+
 class OpenWeatherIntegration:
     """OpenWeather API integration for rainfall forecasting"""
     
-    def __init__(self, api_key: str = "your_openweather_api_key"):
+    def __init__(self, api_key: str = "your_openweather_api_key",
+                 redis_url: Optional[str] = os.getenv("REDIS_URL")):
         self.api_key = api_key
         self.base_url = "http://api.openweathermap.org/data/2.5"
         self.cache_duration = 3600  # 1 hour cache
+        self.negative_cache_duration = 300  # 5 minute cache for 4xx responses
+        self.local_cache_size = 256
+        self._local_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[Tuple[float, float, int], asyncio.Future] = {}
+        self.redis = aioredis.from_url(redis_url) if aioredis and redis_url else None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared keep-alive HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+    
+    async def aclose(self):
+        """Close the shared HTTP session and Redis client"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.redis is not None:
+            await self.redis.aclose()
+    
+    def _cache_key(self, endpoint: str, lat: float, lng: float) -> str:
+        """Cache key for an endpoint at a coordinate rounded to ~1 km"""
+        return f"owm:{endpoint}:{round(lat, 2)}:{round(lng, 2)}"
+    
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an unexpired entry from the in-process LRU cache"""
+        entry = self._local_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._local_cache[key]
+            return None
+        self._local_cache.move_to_end(key)
+        return entry[1]
+    
+    def _local_set(self, key: str, payload: Dict[str, Any], ttl: int):
+        """Store an entry in the in-process LRU cache, evicting the oldest"""
+        self._local_cache[key] = (time.monotonic() + ttl, payload)
+        self._local_cache.move_to_end(key)
+        if len(self._local_cache) > self.local_cache_size:
+            self._local_cache.popitem(last=False)
+    
+    async def _fetch_json(self, endpoint: str, lat: float, lng: float,
+                          params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a raw OpenWeather payload through a two-tier cache.
+        
+        An in-process LRU (L1) is checked first, then Redis (L2) when
+        configured, and only then the API.
+        """
+        key = self._cache_key(endpoint, lat, lng)
+        
+        payload = self._local_get(key)
+        if payload is None and self.redis is not None:
+            try:
+                cached = await self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Weather cache read error: {str(e)}")
+                cached = None
+            if cached is not None:
+                payload = orjson.loads(cached)
+                ttl = self.negative_cache_duration if "error_status" in payload else self.cache_duration
+                self._local_set(key, payload, ttl)
+        if payload is not None:
+            return None if "error_status" in payload else payload
+        
+        url = f"{self.base_url}/{endpoint}"
+        params = {**params, "lat": lat, "lon": lng, "appid": self.api_key, "units": "metric"}
+        async with self._get_session().get(url, params=params) as response:
+            status = response.status
+            data = orjson.loads(await response.read()) if status == 200 else None
+        
+        # Cache successes for the full duration and client errors briefly,
+        # so a bad key or location doesn't burn API credits on every call
+        if status == 200:
+            payload, ttl = data, self.cache_duration
+        elif 400 <= status < 500:
+            payload, ttl = {"error_status": status}, self.negative_cache_duration
+        else:
+            payload, ttl = None, None
+        
+        if ttl:
+            self._local_set(key, payload, ttl)
+        if self.redis is not None and ttl:
+            try:
+                await self.redis.set(key, orjson.dumps(payload), ex=ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ Weather cache write error: {str(e)}")
+        
+        if status != 200:
+            logger.error(f"❌ OpenWeather {endpoint} API error: {status}")
+            return None
+        return data
     
     async def get_rainfall_forecast(self, lat: float, lng: float, days: int = 5) -> List[Dict[str, Any]]:
-        """Get 5-day rainfall forecast for a location"""
+        """
+        Get 5-day rainfall forecast for a location.
+        
+        Concurrent requests within the same ~10 km bucket share a single
+        in-flight fetch instead of each calling the API.
+        """
+        key = (round(lat, 1), round(lng, 1), days)
+        fetch = self._inflight.get(key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._get_rainfall_forecast(lat, lng, days))
+            self._inflight[key] = fetch
+            fetch.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(fetch)
+    
+    async def _get_rainfall_forecast(self, lat: float, lng: float, days: int) -> List[Dict[str, Any]]:
+        """Fetch and format the rainfall forecast for a location"""
         try:
             # Use One Call API for detailed forecast
-            url = f"{self.base_url}/onecall"
-            params = {
-                "lat": lat,
-                "lon": lng,
-                "exclude": "minutely,alerts",
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
+            data = await self._fetch_json("onecall", lat, lng, {"exclude": "minutely,alerts"})
+            if data is None:
+                return []
             
-            if response.status_code == 200:
-                data = response.json()
-                forecasts = []
-                
-                # Current weather
-                current = data.get("current", {})
+            forecasts = []
+            
+            # Current weather
+            current = data.get("current", {})
+            forecasts.append({
+                "date": datetime.fromtimestamp(current.get("dt", 0)).strftime("%Y-%m-%d"),
+                "rainfall_mm": current.get("rain", {}).get("1h", 0) * 24,  # Convert to daily
+                "humidity": current.get("humidity", 0),
+                "pressure": current.get("pressure", 0),
+                "wind_speed": current.get("wind_speed", 0),
+                "description": current.get("weather", [{}])[0].get("description", "")
+            })
+            
+            # Daily forecasts
+            daily_forecasts = data.get("daily", [])[:days-1]
+            for day in daily_forecasts:
                 forecasts.append({
-                    "date": datetime.fromtimestamp(current.get("dt", 0)).strftime("%Y-%m-%d"),
-                    "rainfall_mm": current.get("rain", {}).get("1h", 0) * 24,  # Convert to daily
-                    "humidity": current.get("humidity", 0),
-                    "pressure": current.get("pressure", 0),
-                    "wind_speed": current.get("wind_speed", 0),
-                    "description": current.get("weather", [{}])[0].get("description", "")
+                    "date": datetime.fromtimestamp(day.get("dt", 0)).strftime("%Y-%m-%d"),
+                    "rainfall_mm": day.get("rain", {}).get("1h", 0) * 24,
+                    "humidity": day.get("humidity", 0),
+                    "pressure": day.get("pressure", 0),
+                    "wind_speed": day.get("wind_speed", 0),
+                    "description": day.get("weather", [{}])[0].get("description", "")
                 })
-                
-                # Daily forecasts
-                daily_forecasts = data.get("daily", [])[:days-1]
-                for day in daily_forecasts:
-                    forecasts.append({
-                        "date": datetime.fromtimestamp(day.get("dt", 0)).strftime("%Y-%m-%d"),
-                        "rainfall_mm": day.get("rain", {}).get("1h", 0) * 24,
-                        "humidity": day.get("humidity", 0),
-                        "pressure": day.get("pressure", 0),
-                        "wind_speed": day.get("wind_speed", 0),
-                        "description": day.get("weather", [{}])[0].get("description", "")
-                    })
-                
-                logger.info(f"✅ Rainfall forecast retrieved for {lat}, {lng}")
-                return forecasts
-                
-            else:
-                logger.error(f"❌ OpenWeather API error: {response.status_code}")
-                return []
+            
+            logger.info(f"✅ Rainfall forecast retrieved for {lat}, {lng}")
+            return forecasts
                 
         except Exception as e:
             logger.error(f"❌ Rainfall forecast error: {str(e)}")
@@ -86,29 +248,18 @@ class OpenWeatherIntegration:
     async def get_current_weather(self, lat: float, lng: float) -> Dict[str, Any]:
         """Get current weather conditions"""
         try:
-            url = f"{self.base_url}/weather"
-            params = {
-                "lat": lat,
-                "lon": lng,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "temperature": data.get("main", {}).get("temp", 0),
-                    "humidity": data.get("main", {}).get("humidity", 0),
-                    "pressure": data.get("main", {}).get("pressure", 0),
-                    "wind_speed": data.get("wind", {}).get("speed", 0),
-                    "rainfall": data.get("rain", {}).get("1h", 0),
-                    "description": data.get("weather", [{}])[0].get("description", "")
-                }
-            else:
-                logger.error(f"❌ Current weather API error: {response.status_code}")
+            data = await self._fetch_json("weather", lat, lng, {})
+            if data is None:
                 return {}
+            
+            return {
+                "temperature": data.get("main", {}).get("temp", 0),
+                "humidity": data.get("main", {}).get("humidity", 0),
+                "pressure": data.get("main", {}).get("pressure", 0),
+                "wind_speed": data.get("wind", {}).get("speed", 0),
+                "rainfall": data.get("rain", {}).get("1h", 0),
+                "description": data.get("weather", [{}])[0].get("description", "")
+            }
                 
         except Exception as e:
             logger.error(f"❌ Current weather error: {str(e)}")
@@ -125,6 +276,16 @@ class ExplainableAI:
             "river_flow": {"safe": 0.3, "moderate": 0.7, "critical": 1.0},
             "drainage_capacity": {"safe": 0.8, "moderate": 0.5, "critical": 0.2}
         }
+        # Precomputed, ordered like risk_thresholds, for vectorized explanations
+        self._feature_order = tuple(self.risk_thresholds)
+        self._titles = {feature: feature.replace("_", " ").title() for feature in self._feature_order}
+        self._moderate_thresholds = np.array(
+            [t["moderate"] for t in self.risk_thresholds.values()], dtype=np.float32
+        )
+        self._critical_thresholds = np.array(
+            [t["critical"] for t in self.risk_thresholds.values()], dtype=np.float32
+        )
+        self._risk_levels = ("safe", "moderate", "critical")
     
     def explain_prediction(self, features: Dict[str, float], prediction: str, 
                           confidence: float, feature_importance: Dict[str, float]) -> Dict[str, Any]:
@@ -138,27 +299,39 @@ class ExplainableAI:
                 "recommendations": []
             }
             
-            # Analyze each feature
-            for feature, value in features.items():
-                if feature in self.risk_thresholds:
-                    thresholds = self.risk_thresholds[feature]
-                    importance = feature_importance.get(feature, 0)
-                    
-                    if importance > self.feature_importance_threshold:
-                        risk_level = self._get_risk_level(value, thresholds)
-                        
-                        explanation["reasoning"].append({
-                            "factor": feature.replace("_", " ").title(),
-                            "value": value,
-                            "risk_level": risk_level,
-                            "importance": importance,
-                            "threshold": thresholds
-                        })
-                        
-                        if risk_level == "critical":
-                            explanation["risk_factors"].append(f"{feature.replace('_', ' ').title()} is critically high ({value})")
-                        elif risk_level == "moderate":
-                            explanation["risk_factors"].append(f"{feature.replace('_', ' ').title()} is moderately high ({value})")
+            # Classify every feature at once and mask out missing or unimportant ones
+            present = np.array([feature in features for feature in self._feature_order])
+            values = np.array(
+                [features.get(feature, 0) for feature in self._feature_order], dtype=np.float32
+            )
+            importances = np.array(
+                [feature_importance.get(feature, 0) for feature in self._feature_order]
+            )
+            level_index = np.maximum(
+                2 * (values >= self._critical_thresholds),
+                values >= self._moderate_thresholds
+            )
+            selected = np.flatnonzero(present & (importances > self.feature_importance_threshold))
+            
+            # Analyze each selected feature
+            for i in selected:
+                feature = self._feature_order[i]
+                title = self._titles[feature]
+                value = features[feature]
+                risk_level = self._risk_levels[level_index[i]]
+                
+                explanation["reasoning"].append({
+                    "factor": title,
+                    "value": value,
+                    "risk_level": risk_level,
+                    "importance": feature_importance[feature],
+                    "threshold": self.risk_thresholds[feature]
+                })
+                
+                if risk_level == "critical":
+                    explanation["risk_factors"].append(f"{title} is critically high ({value})")
+                elif risk_level == "moderate":
+                    explanation["risk_factors"].append(f"{title} is moderately high ({value})")
             
             # Generate recommendations
             explanation["recommendations"] = self._generate_recommendations(prediction, explanation["risk_factors"])
@@ -169,57 +342,31 @@ class ExplainableAI:
             logger.error(f"❌ Explanation generation error: {str(e)}")
             return {"prediction": prediction, "confidence": confidence, "reasoning": [], "error": str(e)}
     
-    def _get_risk_level(self, value: float, thresholds: Dict[str, float]) -> str:
-        """Determine risk level based on thresholds"""
-        if value >= thresholds["critical"]:
-            return "critical"
-        elif value >= thresholds["moderate"]:
-            return "moderate"
-        else:
-            return "safe"
-    
-    def _generate_recommendations(self, prediction: str, risk_factors: List[str]) -> List[str]:
+    def _generate_recommendations(self, prediction: str, risk_factors: List[str]) -> Tuple[str, ...]:
         """Generate recommendations based on prediction and risk factors"""
-        recommendations = []
-        
-        if prediction == "critical":
-            recommendations.extend([
-                "🚨 IMMEDIATE EVACUATION REQUIRED",
-                "📢 Issue emergency alerts to all residents",
-                "🚁 Deploy rescue teams and helicopters",
-                "🏥 Prepare emergency medical facilities",
-                "📡 Activate emergency communication systems"
-            ])
-        elif prediction == "moderate":
-            recommendations.extend([
-                "⚠️ Monitor situation closely",
-                "📢 Issue flood watch warnings",
-                "🚧 Prepare evacuation routes",
-                "📦 Stock emergency supplies",
-                "📱 Keep communication channels open"
-            ])
-        else:
-            recommendations.extend([
-                "✅ Continue normal monitoring",
-                "📊 Regular data collection",
-                "🔍 Watch for weather changes",
-                "📋 Maintain preparedness protocols"
-            ])
-        
-        return recommendations
+        return _RECOMMENDATIONS.get(prediction, _SAFE_RECS)
 
 class HistoricalLearning:
     """Historical learning system for model improvement"""
     
-    def __init__(self, database_path: str = "flood_monitoring.db"):
+    def __init__(self, database_path: str = "flood_monitoring.db",
+                 batch_size: int = 100, flush_interval: float = 5.0):
         self.database_path = database_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn: Optional[sqlite3.Connection] = None
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
         self.init_database()
     
     def init_database(self):
-        """Initialize historical learning database"""
+        """Open the persistent WAL-mode connection and initialize tables"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
+            self.conn = sqlite3.connect(self.database_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            cursor = self.conn.cursor()
             
             # Historical data table
             cursor.execute('''
@@ -251,8 +398,18 @@ class HistoricalLearning:
                 )
             ''')
             
-            conn.commit()
-            conn.close()
+            # Indexes for outcome updates and training data lookups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_city_ts
+                ON historical_data(city, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_flood_notnull
+                ON historical_data(actual_flood_occurred)
+                WHERE actual_flood_occurred IS NOT NULL
+            ''')
+            
+            self.conn.commit()
             logger.info("✅ Historical learning database initialized")
             
         except Exception as e:
@@ -260,44 +417,59 @@ class HistoricalLearning:
     
     def store_prediction_data(self, city: str, lat: float, lng: float, 
                             features: Dict[str, float], prediction: str, confidence: float):
-        """Store prediction data for future learning"""
-        try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO historical_data 
-                (city, lat, lng, water_level, rainfall, river_flow, drainage_capacity, prediction_accuracy)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        """Queue prediction data for future learning, flushing in batches"""
+        with self._lock:
+            self._pending.append((
                 city, lat, lng,
                 features.get("water_level", 0),
                 features.get("rainfall", 0),
                 features.get("river_flow", 0),
                 features.get("drainage_capacity", 0),
-                confidence
+                confidence,
+                # Prediction time in SQLite's CURRENT_TIMESTAMP format (UTC), not flush time
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
             ))
             
-            conn.commit()
-            conn.close()
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def flush(self):
+        """Write all queued prediction data in one transaction"""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        """Write queued prediction data; caller must hold the lock"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        
+        try:
+            self.conn.executemany('''
+                INSERT INTO historical_data 
+                (city, lat, lng, water_level, rainfall, river_flow, drainage_capacity, prediction_accuracy, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', self._pending)
+            self.conn.commit()
             
         except Exception as e:
+            self.conn.rollback()
             logger.error(f"❌ Store prediction data error: {str(e)}")
+        finally:
+            self._pending.clear()
     
     def update_with_actual_outcome(self, city: str, timestamp: str, actual_flood_occurred: bool):
         """Update historical data with actual flood outcome"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE historical_data 
-                SET actual_flood_occurred = ?
-                WHERE city = ? AND timestamp = ?
-            ''', (1 if actual_flood_occurred else 0, city, timestamp))
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                self._flush_locked()
+                self.conn.execute('''
+                    UPDATE historical_data 
+                    SET actual_flood_occurred = ?
+                    WHERE city = ? AND timestamp = ?
+                ''', (1 if actual_flood_occurred else 0, city, timestamp))
+                self.conn.commit()
             
         except Exception as e:
             logger.error(f"❌ Update actual outcome error: {str(e)}")
@@ -305,8 +477,6 @@ class HistoricalLearning:
     def get_training_data(self, limit: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
         """Get historical data for model retraining"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            
             query = '''
                 SELECT water_level, rainfall, river_flow, drainage_capacity, actual_flood_occurred
                 FROM historical_data 
@@ -315,12 +485,14 @@ class HistoricalLearning:
                 LIMIT ?
             '''
             
-            df = pd.read_sql_query(query, conn, params=(limit,))
-            conn.close()
+            with self._lock:
+                self._flush_locked()
+                rows = self.conn.execute(query, (limit,)).fetchall()
             
-            if len(df) > 0:
-                X = df[['water_level', 'rainfall', 'river_flow', 'drainage_capacity']].values
-                y = df['actual_flood_occurred'].values
+            if rows:
+                data = np.array(rows, dtype=np.float32)
+                X = data[:, :4]
+                y = data[:, 4].astype(np.int32)
                 return X, y
             else:
                 return np.array([]), np.array([])
@@ -328,6 +500,14 @@ class HistoricalLearning:
         except Exception as e:
             logger.error(f"❌ Get training data error: {str(e)}")
             return np.array([]), np.array([])
+    
+    def close(self):
+        """Flush queued data and close the database connection"""
+        with self._lock:
+            if self.conn is not None:
+                self._flush_locked()
+                self.conn.close()
+                self.conn = None
 
 class EnhancedAIPredictor:
     """Enhanced AI Predictor with multi-class outputs and explainable AI"""
@@ -335,12 +515,20 @@ class EnhancedAIPredictor:
     def __init__(self):
         self.model_path = "enhanced_model.pkl"
         self.scaler_path = "enhanced_scaler.pkl"
+        self.compiled_model_path = "enhanced_model.so"
         self.model = None
+        self.compiled_predictor = None
+        self.forest_arrays = None
         self.scaler = None
+        self._mean = None
+        self._scale = None
         self.explainable_ai = ExplainableAI()
         self.historical_learning = HistoricalLearning()
         self.openweather = OpenWeatherIntegration()
         self.class_names = ["safe", "moderate", "critical"]
+        self.retrain_increment = 20
+        self._load_lock = asyncio.Lock()
+        self._background_tasks = set()
         
     def load_model(self):
         """Load or create enhanced AI model"""
@@ -348,6 +536,8 @@ class EnhancedAIPredictor:
             if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
                 self.model = joblib.load(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
+                self._cache_scaler_stats()
+                self._compile_model()
                 logger.info("✅ Enhanced AI model loaded successfully")
             else:
                 logger.info("🔄 Creating new enhanced AI model...")
@@ -357,63 +547,36 @@ class EnhancedAIPredictor:
             logger.error(f"❌ Model loading error: {str(e)}")
             self._create_new_model()
     
+    async def preload(self):
+        """Load the model off the event loop, once, before serving predictions"""
+        async with self._load_lock:
+            if self.model is None or self.scaler is None:
+                await asyncio.to_thread(self.load_model)
+    
     def _create_new_model(self):
         """Create new enhanced AI model with multi-class outputs"""
         try:
             # Generate synthetic training data for demonstration
-            np.random.seed(42)
+            rng = np.random.default_rng(42)
             n_samples = 1000
             
-            # Generate features
-            water_level = np.random.uniform(0, 10, n_samples)
-            rainfall = np.random.uniform(0, 200, n_samples)
-            river_flow = np.random.uniform(0, 1, n_samples)
-            drainage_capacity = np.random.uniform(0, 1, n_samples)
-            
-            # Generate multi-class labels based on combinations
-            labels = []
-            for i in range(n_samples):
-                risk_score = 0
-                
-                # Water level risk
-                if water_level[i] > 8:
-                    risk_score += 3
-                elif water_level[i] > 5:
-                    risk_score += 2
-                elif water_level[i] > 2:
-                    risk_score += 1
-                
-                # Rainfall risk
-                if rainfall[i] > 100:
-                    risk_score += 3
-                elif rainfall[i] > 50:
-                    risk_score += 2
-                elif rainfall[i] > 20:
-                    risk_score += 1
-                
-                # River flow risk
-                if river_flow[i] > 0.8:
-                    risk_score += 2
-                elif river_flow[i] > 0.5:
-                    risk_score += 1
-                
-                # Drainage capacity risk
-                if drainage_capacity[i] < 0.3:
-                    risk_score += 2
-                elif drainage_capacity[i] < 0.5:
-                    risk_score += 1
-                
-                # Assign class based on total risk score
-                if risk_score >= 6:
-                    labels.append(2)  # critical
-                elif risk_score >= 3:
-                    labels.append(1)  # moderate
-                else:
-                    labels.append(0)  # safe
+            # Generate features in one draw: water level, rainfall, river flow, drainage capacity
+            X = rng.uniform(
+                low=[0, 0, 0, 0], high=[10, 200, 1, 1], size=(n_samples, 4)
+            ).astype(np.float32)
+            water_level, rainfall, river_flow, drainage_capacity = X.T
+            
+            # Generate multi-class labels based on combinations: each feature
+            # scores the number of risk thresholds it crosses
+            risk_score = (
+                np.searchsorted([2, 5, 8], water_level)              # > 2, > 5, > 8
+                + np.searchsorted([20, 50, 100], rainfall)           # > 20, > 50, > 100
+                + np.searchsorted([0.5, 0.8], river_flow)            # > 0.5, > 0.8
+                + 2 - np.searchsorted([0.3, 0.5], drainage_capacity, side='right')  # < 0.5, < 0.3
+            )
             
-            # Prepare training data
-            X = np.column_stack([water_level, rainfall, river_flow, drainage_capacity])
-            y = np.array(labels)
+            # Assign class based on total risk score (0 safe, 1 moderate, 2 critical)
+            y = np.searchsorted([3, 6], risk_score, side='right')
             
             # Scale features
             self.scaler = StandardScaler()
@@ -424,26 +587,117 @@ class EnhancedAIPredictor:
                 n_estimators=100,
                 max_depth=10,
                 random_state=42,
-                class_weight='balanced'
+                class_weight='balanced',
+                warm_start=True
             )
             
-            self.model.fit(X_scaled, y)
+            self._fit_model(X_scaled, y)
             
             # Save model
             joblib.dump(self.model, self.model_path)
             joblib.dump(self.scaler, self.scaler_path)
+            self._cache_scaler_stats()
+            self._compile_model()
             
             logger.info("✅ Enhanced AI model created and saved successfully")
             
         except Exception as e:
             logger.error(f"❌ Model creation error: {str(e)}")
     
+    def _cache_scaler_stats(self):
+        """Cache scaler mean and scale so requests can scale inline"""
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._scale = self.scaler.scale_.astype(np.float32)
+    
+    def _fit_model(self, X: np.ndarray, y: np.ndarray):
+        """
+        Fit the forest on all cores, then drop back to a single job.
+        
+        Tree building parallelizes well, but for the single-row predictions
+        on the request path joblib dispatch costs more than it saves.
+        """
+        self.model.set_params(n_jobs=-1)
+        self.model.fit(X, y)
+        self.model.set_params(n_jobs=1)
+    
+    def _compile_model(self):
+        """
+        Compile the forest to native code with Treelite when available.
+        
+        The shared library is rebuilt whenever the pickled model is newer,
+        and predictions fall back to scikit-learn if compilation fails.
+        """
+        self.compiled_predictor = None
+        self._flatten_forest()
+        if treelite is None or self.model is None:
+            return
+        
+        try:
+            is_stale = (
+                not os.path.exists(self.compiled_model_path)
+                or os.path.getmtime(self.compiled_model_path) < os.path.getmtime(self.model_path)
+            )
+            if is_stale:
+                tl_model = treelite.sklearn.import_model(self.model)
+                tl_model.export_lib(
+                    toolchain="gcc",
+                    libpath=self.compiled_model_path,
+                    params={"parallel_comp": 4}
+                )
+            self.compiled_predictor = treelite_runtime.Predictor(self.compiled_model_path)
+            logger.info("✅ Compiled native model loaded")
+        except Exception as e:
+            logger.warning(f"⚠️ Model compilation unavailable, using scikit-learn: {str(e)}")
+    
+    def _flatten_forest(self):
+        """
+        Flatten the forest into contiguous node arrays for the Numba kernel.
+        
+        Child indices are offset so every tree lives in one set of arrays,
+        and leaf values are normalized to class probabilities as sklearn does.
+        """
+        self.forest_arrays = None
+        if numba is None or self.model is None:
+            return
+        
+        roots, feature, threshold, left, right, value = [], [], [], [], [], []
+        offset = 0
+        for estimator in self.model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            leaf_value = tree.value[:, 0, :]
+            roots.append(offset)
+            feature.append(tree.feature)
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            value.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+            offset += tree.node_count
+        
+        self.forest_arrays = (
+            np.array(roots, dtype=np.int32),
+            np.concatenate(feature).astype(np.int32),
+            np.concatenate(threshold),
+            np.concatenate(left).astype(np.int32),
+            np.concatenate(right).astype(np.int32),
+            np.concatenate(value)
+        )
+    
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities from the compiled model, the Numba kernel, or scikit-learn"""
+        if self.compiled_predictor is not None:
+            proba = self.compiled_predictor.predict(treelite_runtime.DMatrix(X))
+            return np.asarray(proba).reshape(len(X), -1)
+        if self.forest_arrays is not None:
+            return _forest_predict_proba(X, *self.forest_arrays)
+        return self.model.predict_proba(X)
+    
     async def predict_flood_risk(self, city: str, lat: float, lng: float, 
                                features: Dict[str, float]) -> Dict[str, Any]:
         """Predict flood risk with explainable AI"""
         try:
             if self.model is None or self.scaler is None:
-                self.load_model()
+                raise RuntimeError("Model not loaded; await preload() at startup")
             
             # Prepare features
             feature_vector = np.array([
@@ -451,14 +705,16 @@ class EnhancedAIPredictor:
                 features.get("rainfall", 0),
                 features.get("river_flow", 0),
                 features.get("drainage_capacity", 0)
-            ]).reshape(1, -1)
+            ], dtype=np.float32).reshape(1, -1)
             
-            # Scale features
-            feature_vector_scaled = self.scaler.transform(feature_vector)
+            # Scale features: (x - mean) / scale, skipping sklearn's validation
+            feature_vector_scaled = (feature_vector - self._mean) / self._scale
             
             # Make prediction
-            prediction_proba = self.model.predict_proba(feature_vector_scaled)[0]
-            prediction_class = self.model.predict(feature_vector_scaled)[0]
+            # One forest pass: derive the class from the probabilities
+            prediction_proba = self._predict_proba(feature_vector_scaled)[0]
+            best_index = int(prediction_proba.argmax())
+            prediction_class = int(self.model.classes_[best_index])
             
             # Get feature importance
             feature_importance = dict(zip(
@@ -468,17 +724,20 @@ class EnhancedAIPredictor:
             
             # Get prediction details
             prediction_name = self.class_names[prediction_class]
-            confidence = prediction_proba[prediction_class] * 100
+            confidence = prediction_proba[best_index] * 100
             
             # Generate explanation
             explanation = self.explainable_ai.explain_prediction(
                 features, prediction_name, confidence, feature_importance
             )
             
-            # Store prediction for learning
-            self.historical_learning.store_prediction_data(
+            # Store prediction for learning in the background
+            store_task = asyncio.create_task(asyncio.to_thread(
+                self.historical_learning.store_prediction_data,
                 city, lat, lng, features, prediction_name, confidence
-            )
+            ))
+            self._background_tasks.add(store_task)
+            store_task.add_done_callback(self._background_tasks.discard)
             
             # Get weather forecast
             weather_forecast = await self.openweather.get_rainfall_forecast(lat, lng, 5)
@@ -507,6 +766,29 @@ class EnhancedAIPredictor:
                 "timestamp": datetime.now().isoformat()
             }
     
+    async def predict_many(self, cities: List[Dict[str, Any]],
+                           concurrency: int = 16) -> List[Dict[str, Any]]:
+        """
+        Predict flood risk for several cities concurrently.
+        
+        Each entry needs city, lat, lng and features keys. Weather requests
+        overlap, bounded by a semaphore to respect API rate limits.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def predict_one(entry: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.predict_flood_risk(
+                    entry["city"], entry["lat"], entry["lng"], entry["features"]
+                )
+        
+        return await asyncio.gather(*(predict_one(entry) for entry in cities))
+    
+    async def drain_background_tasks(self):
+        """Wait for pending historical writes to finish"""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+    
     async def retrain_model(self):
         """Retrain model with historical data"""
         try:
@@ -515,16 +797,33 @@ class EnhancedAIPredictor:
             X, y = self.historical_learning.get_training_data()
             
             if len(X) > 50:  # Minimum data for retraining
-                # Scale features
-                X_scaled = self.scaler.transform(X)
+                X = X.astype(np.float32)
                 
-                # Retrain model
-                self.model.fit(X_scaled, y)
+                if np.array_equal(np.unique(y), self.model.classes_):
+                    # Same classes: grow the existing forest with a few new trees.
+                    # The scaler stays fixed because the existing trees split on its output.
+                    X_scaled = self.scaler.transform(X)
+                    self.model.set_params(
+                        warm_start=True,
+                        n_estimators=self.model.n_estimators + self.retrain_increment
+                    )
+                    self._fit_model(X_scaled, y)
+                    mode = "incremental"
+                else:
+                    # Class set changed: refit scaler and forest from scratch
+                    X_scaled = self.scaler.fit_transform(X)
+                    self.model.set_params(warm_start=False)
+                    self._fit_model(X_scaled, y)
+                    self.model.set_params(warm_start=True)
+                    joblib.dump(self.scaler, self.scaler_path)
+                    self._cache_scaler_stats()
+                    mode = "full"
                 
                 # Save updated model
                 joblib.dump(self.model, self.model_path)
+                self._compile_model()
                 
-                logger.info(f"✅ Model retrained successfully with {len(X)} samples")
+                logger.info(f"✅ Model retrained successfully ({mode}) with {len(X)} samples")
                 return True
             else:
                 logger.warning("⚠️ Insufficient historical data for retraining")
@@ -540,7 +839,7 @@ async def main():
     logger.info("🌊 Starting JalRakshā AI Enhanced Prediction Engine...")
     
     predictor = EnhancedAIPredictor()
-    predictor.load_model()
+    await predictor.preload()
     
     # Test prediction
     test_features = {
@@ -551,9 +850,12 @@ async def main():
     }
     
     result = await predictor.predict_flood_risk("Test City", 25.5941, 85.1376, test_features)
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
+    
+    await predictor.drain_background_tasks()
+    await predictor.openweather.aclose()
+    predictor.historical_learning.close()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
 
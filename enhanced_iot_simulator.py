@@ -6,22 +6,41 @@ This simulator generates realistic flood data for all Indian cities
 and sends it to the FastAPI backend for real-time monitoring.
 """
 
+import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
 import random
 import time
-import requests
 import threading
 import sqlite3
-from datetime import datetime
-import pytz
-import json
-from typing import Dict, List
+import numpy as np
+import aiohttp
+import orjson
+import sys
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger("iot_simulator")
 
 # ---------------------------
 # Configuration
 # ---------------------------
 FASTAPI_URL = "http://localhost:8000/api/v1/predict"
+FASTAPI_BATCH_URL = f"{FASTAPI_URL}/batch"
+JSON_HEADERS = {"Content-Type": "application/json"}
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60  # UTC+05:30, India has no DST
 MONITORING_URL = "http://localhost:8000/api/v1/flood/monitoring"
 DB_NAME = "iot_sensor_data.db"
+WRITE_BATCH_SIZE = 1000  # Max rows per SQLite transaction
+WRITE_FLUSH_INTERVAL = 2.0  # Max seconds a reading waits before being written
+PREDICT_BATCH_SIZE = 32  # Max readings per batched prediction request
+PREDICT_BATCH_WINDOW = 0.2  # Max seconds a reading waits for its batch to fill
+CONNECT_RETRIES = 2  # Retries when a connection to the backend cannot be opened
+CONNECT_BACKOFF = 0.2  # Seconds before the first retry, doubled after each
+LOCAL_PREFILTER = True  # Classify clearly LOW/HIGH readings locally instead of calling the API
+LOCAL_CONFIDENCE = 0.95  # Confidence reported for locally classified readings
+API_READING_LIMITS = {"water_level": 50, "rainfall": 500, "river_flow": 10000}  # PredictionRequest maxima
 
 # Indian Cities with realistic flood risk factors
 INDIAN_CITIES = {
@@ -103,18 +122,94 @@ INDIAN_CITIES = {
     "Wayanad": {"state": "Kerala", "flood_risk_factor": 0.7, "monsoon_intensity": 0.8}
 }
 
+# Structure-of-arrays view of INDIAN_CITIES: one index per city into
+# parallel columns, so lookups skip the nested dicts
+# Names and states are interned so every row and lookup shares one str object
+CITY_NAMES = tuple(sys.intern(city) for city in INDIAN_CITIES)
+CITY_IDX = {city: index for index, city in enumerate(CITY_NAMES)}
+CITY_STATES = tuple(sys.intern(info["state"]) for info in INDIAN_CITIES.values())
+CITY_RISK = np.array([info["flood_risk_factor"] for info in INDIAN_CITIES.values()])
+CITY_MONSOON = np.array([info["monsoon_intensity"] for info in INDIAN_CITIES.values()])
+
+# Per-city reading offsets, precomputed so readings for all cities are generated in one pass
+_WATER_OFFSET = np.floor(CITY_RISK * 80 + CITY_MONSOON * 40).astype(np.int32)
+_RAINFALL_OFFSET = np.floor(CITY_RISK * 200 + CITY_MONSOON * 150).astype(np.int32)
+_RIVER_FLOW_OFFSET = np.floor(CITY_RISK * 400 + CITY_MONSOON * 300).astype(np.int32)
+
+# One PCG64 generator for all bulk sensor draws
+_RNG = np.random.default_rng()
+
+# Latest generated reading per city, and whether it is still unused
+_readings = np.zeros((len(CITY_NAMES), 3), dtype=np.int32)
+_reading_fresh = np.zeros(len(CITY_NAMES), dtype=bool)
+_reading_labels = np.zeros(len(CITY_NAMES), dtype=np.int8)
+
+# Predictions for readings classified locally, indexed by classify_obvious_readings labels
+_LOCAL_PREDICTIONS = (
+    None,
+    {
+        "risk_level": "LOW",
+        "confidence": LOCAL_CONFIDENCE,
+        "local": True,
+        "reason": "Normal conditions with safe water levels (classified locally)",
+        "recommendation": "✅ SITUATION NORMAL - Continue monitoring and stay informed",
+        "helpline": "• General Emergency: 112"
+    },
+    {
+        "risk_level": "HIGH",
+        "confidence": LOCAL_CONFIDENCE,
+        "local": True,
+        "reason": "Severe flood conditions detected with high water levels and heavy rainfall (classified locally)",
+        "recommendation": "🚨 IMMEDIATE EVACUATION REQUIRED - Activate emergency protocols",
+        "helpline": "• National Disaster Helpline: 1078\n• NDMA Helpline: 011-26701728\n• Ambulance: 108"
+    }
+)
+
+INSERT_SENSOR_SQL = """
+    INSERT INTO sensor_data (city, state, water_level, rainfall, river_flow, 
+                           risk_level, confidence, timestamp, sent_to_api)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Sensor rows waiting for the writer thread; None asks it to flush and stop
+_write_queue: "queue.Queue" = queue.Queue()
+_writer_thread = None
+
+# Log records waiting for the background log writer
+_log_queue: "queue.Queue" = queue.Queue()
+_log_listener = None
+
+# Readings waiting for a batched prediction, with the future each caller awaits
+_pred_queue: "asyncio.Queue" = None
+
 # ---------------------------
 # Helper Functions
 # ---------------------------
+def setup_logging():
+    """Route simulator logs through a queue so the event loop never blocks on stdout."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, console)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
 def get_current_time():
     """Get current IST time."""
-    ist = pytz.timezone("Asia/Kolkata")
-    return datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S")
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() + IST_OFFSET_SECONDS))
 
 def init_database():
     """Initialize IoT sensor database."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA page_size=8192")  # Only takes effect when the file is created
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS sensor_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -126,185 +221,316 @@ def init_database():
             risk_level TEXT,
             confidence REAL,
             timestamp TEXT,
-            sent_to_api BOOLEAN DEFAULT FALSE
+            sent_to_api INTEGER DEFAULT 0
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_city_time ON sensor_data(city, timestamp DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sent ON sensor_data(sent_to_api) WHERE sent_to_api = 0")
     conn.commit()
     conn.close()
+    
+    # Start the single background writer
+    global _writer_thread
+    if _writer_thread is None:
+        _writer_thread = threading.Thread(target=_db_writer, name="sqlite-writer", daemon=True)
+        _writer_thread.start()
+        atexit.register(_stop_db_writer)
+
+def _db_writer():
+    """Write queued sensor rows in batches on one persistent connection."""
+    conn = sqlite3.connect(DB_NAME, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+    
+    running = True
+    while running:
+        # Block for the first row, then gather more until the batch is full or the window closes
+        rows = []
+        item = _write_queue.get()
+        deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+        while item is not None:
+            rows.append(item)
+            if len(rows) >= WRITE_BATCH_SIZE:
+                break
+            try:
+                item = _write_queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        running = item is not None
+        
+        if rows:
+            try:
+                conn.execute("BEGIN")
+                conn.executemany(INSERT_SENSOR_SQL, rows)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK")
+                logger.error("❌ Failed to save %d sensor readings: %s", len(rows), e)
+    
+    conn.close()
+
+def _stop_db_writer():
+    """Flush pending sensor rows and stop the writer thread."""
+    global _writer_thread
+    if _writer_thread is not None:
+        _write_queue.put(None)
+        _writer_thread.join(timeout=10)
+        _writer_thread = None
 
 def save_sensor_data(city: str, sensor_data: Dict, prediction: Dict = None):
-    """Save sensor data to database."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO sensor_data (city, state, water_level, rainfall, river_flow, 
-                               risk_level, confidence, timestamp, sent_to_api)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+    """Queue sensor data for the batched database writer."""
+    _write_queue.put((
         city,
-        INDIAN_CITIES[city]["state"],
+        CITY_STATES[CITY_IDX[city]],
         sensor_data["water_level"],
         sensor_data["rainfall"],
         sensor_data["river_flow"],
         prediction["risk_level"] if prediction else "UNKNOWN",
         prediction["confidence"] if prediction else 0.0,
         sensor_data["timestamp"],
-        prediction is not None
+        int(prediction is not None and not prediction.get("local"))
     ))
-    conn.commit()
-    conn.close()
 
-def generate_realistic_sensor_data(city: str) -> Dict:
-    """Generate realistic sensor data for a city."""
-    city_info = INDIAN_CITIES[city]
-    flood_risk_factor = city_info["flood_risk_factor"]
-    monsoon_intensity = city_info["monsoon_intensity"]
-    
-    # Base values
-    base_water_level = random.randint(0, 30)
-    base_rainfall = random.randint(0, 50)
-    base_river_flow = random.randint(0, 100)
+def generate_all_sensor_data() -> np.ndarray:
+    """Generate one reading for every city in a single vectorized pass."""
+    n = len(CITY_NAMES)
     
-    # Adjust based on flood risk factor and monsoon intensity
-    water_level = min(150, int(base_water_level + (flood_risk_factor * 80) + (monsoon_intensity * 40)))
-    rainfall = min(400, int(base_rainfall + (flood_risk_factor * 200) + (monsoon_intensity * 150)))
-    river_flow = min(800, int(base_river_flow + (flood_risk_factor * 400) + (monsoon_intensity * 300)))
+    # Base values adjusted by flood risk factor and monsoon intensity, then capped
+    water_level = np.minimum(150, _RNG.integers(0, 31, n) + _WATER_OFFSET)
+    rainfall = np.minimum(400, _RNG.integers(0, 51, n) + _RAINFALL_OFFSET)
+    river_flow = np.minimum(800, _RNG.integers(0, 101, n) + _RIVER_FLOW_OFFSET)
     
     # Add some randomness for realistic variation
-    water_level += random.randint(-10, 10)
-    rainfall += random.randint(-20, 20)
-    river_flow += random.randint(-50, 50)
+    water_level += _RNG.integers(-10, 11, n)
+    rainfall += _RNG.integers(-20, 21, n)
+    river_flow += _RNG.integers(-50, 51, n)
     
     # Ensure non-negative values
-    water_level = max(0, water_level)
-    rainfall = max(0, rainfall)
-    river_flow = max(0, river_flow)
+    return np.maximum(0, np.column_stack([water_level, rainfall, river_flow]))
+
+def classify_obvious_readings(readings: np.ndarray) -> np.ndarray:
+    """Label readings far from any threshold: 0 needs the API, 1 clearly LOW, 2 clearly HIGH."""
+    water_level, rainfall, river_flow = readings.T
+    obvious_low = (water_level < 40) & (rainfall < 100) & (river_flow < 200)
+    obvious_high = (water_level > 130) & (rainfall > 350) & (river_flow > 700)
+    return obvious_low + 2 * obvious_high
+
+def refresh_readings():
+    """Generate and label a fresh reading for every city."""
+    global _readings, _reading_labels
+    _readings = generate_all_sensor_data()
+    _reading_labels = classify_obvious_readings(_readings)
+    _reading_fresh[:] = True
+
+def next_city_reading(city: str) -> Tuple[Dict, Dict]:
+    """Take a city's next reading, with a local prediction when it is an obvious case."""
+    index = CITY_IDX[city]
     
-    return {
+    # Take this city's pending reading, regenerating every city's once it has been used
+    if not _reading_fresh[index]:
+        refresh_readings()
+    _reading_fresh[index] = False
+    water_level, rainfall, river_flow = _readings[index].tolist()
+    
+    sensor_data = {
         "city": city,
         "water_level": water_level,
         "rainfall": rainfall,
         "river_flow": river_flow,
         "timestamp": get_current_time()
     }
+    return sensor_data, _LOCAL_PREDICTIONS[_reading_labels[index]] if LOCAL_PREFILTER else None
+
+def generate_realistic_sensor_data(city: str) -> Dict:
+    """Generate realistic sensor data for a city."""
+    return next_city_reading(city)[0]
+
+def create_session() -> aiohttp.ClientSession:
+    """Create the shared keep-alive HTTP session for the simulator."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=200, limit_per_host=100, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+
+async def _post_json(session: aiohttp.ClientSession, url: str, payload) -> Tuple[int, object]:
+    """POST JSON on the pooled session, retrying failed connection attempts with backoff."""
+    for attempt in range(CONNECT_RETRIES + 1):
+        try:
+            async with session.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS) as response:
+                if response.status == 200:
+                    return response.status, orjson.loads(await response.read())
+                return response.status, await response.text()
+        except aiohttp.ClientConnectorError:
+            if attempt == CONNECT_RETRIES:
+                raise
+            await asyncio.sleep(CONNECT_BACKOFF * 2 ** attempt)
 
-def send_to_fastapi(sensor_data: Dict) -> Dict:
+async def send_to_fastapi(session: aiohttp.ClientSession, sensor_data: Dict) -> Dict:
     """Send sensor data to FastAPI backend."""
     try:
-        response = requests.post(
-            FASTAPI_URL,
-            json=sensor_data,
-            timeout=10,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
+        status, body = await _post_json(session, FASTAPI_URL, sensor_data)
+        if status == 200:
+            return body
         else:
-            print(f"❌ API Error {response.status_code}: {response.text}")
+            logger.error("❌ API Error %s: %s", status, body)
             return None
             
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Connection error: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("⚠️ Connection error: %s", e)
         return None
 
-def get_monitoring_status() -> Dict:
+async def send_batch_to_fastapi(session: aiohttp.ClientSession, readings: List[Dict]) -> List[Dict]:
+    """Send a batch of sensor readings to FastAPI, one prediction per reading."""
+    try:
+        status, body = await _post_json(session, FASTAPI_BATCH_URL, readings)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("⚠️ Connection error: %s", e)
+        return [None] * len(readings)
+    
+    if status == 200:
+        return body
+    elif status == 422:
+        # One invalid reading rejects the whole batch; retry individually
+        return await asyncio.gather(*(send_to_fastapi(session, r) for r in readings))
+    else:
+        logger.error("❌ Batch API Error %s: %s", status, body)
+        return [None] * len(readings)
+
+async def batch_dispatcher(session: aiohttp.ClientSession, pred_queue: asyncio.Queue):
+    """Coalesce queued readings into batched prediction requests."""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        # Wait for the first reading, then fill the batch until it is full or the window closes
+        batch = [await pred_queue.get()]
+        deadline = loop.time() + PREDICT_BATCH_WINDOW
+        while len(batch) < PREDICT_BATCH_SIZE:
+            try:
+                batch.append(await asyncio.wait_for(pred_queue.get(), deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+        
+        try:
+            predictions = await send_batch_to_fastapi(session, [reading for reading, _ in batch])
+        except Exception as e:
+            logger.error("❌ Batch prediction error: %s", e)
+            predictions = []
+        
+        # Every caller gets an answer, None when its prediction is missing
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(predictions[index] if index < len(predictions) else None)
+
+def within_api_limits(sensor_data: Dict) -> bool:
+    """Check a reading against the prediction API's validation bounds."""
+    return all(0 <= sensor_data[field] <= limit for field, limit in API_READING_LIMITS.items())
+
+async def request_prediction(session: aiohttp.ClientSession, sensor_data: Dict) -> Dict:
+    """Get a prediction through the batch dispatcher, or directly when none is running."""
+    # The API rejects out-of-range readings, and one of them would fail a whole batch
+    if not within_api_limits(sensor_data):
+        return None
+    
+    if _pred_queue is None:
+        return await send_to_fastapi(session, sensor_data)
+    
+    future = asyncio.get_running_loop().create_future()
+    await _pred_queue.put((sensor_data, future))
+    return await future
+
+async def get_monitoring_status(session: aiohttp.ClientSession) -> Dict:
     """Get current monitoring status from FastAPI."""
     try:
-        response = requests.get(MONITORING_URL, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except:
+        async with session.get(MONITORING_URL, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            if response.status == 200:
+                return orjson.loads(await response.read())
+            else:
+                return None
+    except Exception:
         return None
 
-def simulate_city_monitoring(city: str, interval: int = 30):
+async def simulate_city_monitoring(city: str, session: aiohttp.ClientSession, interval: int = 30):
     """Simulate monitoring for a specific city."""
-    print(f"🌊 Starting IoT simulation for {city}...")
+    logger.info("🌊 Starting IoT simulation for %s...", city)
     
     while True:
         try:
-            # Generate sensor data
-            sensor_data = generate_realistic_sensor_data(city)
-            
-            print(f"\n📡 {city} Sensor Data:")
-            print(f"   💧 Water Level: {sensor_data['water_level']} cm")
-            print(f"   🌧️ Rainfall: {sensor_data['rainfall']} mm")
-            print(f"   🌊 River Flow: {sensor_data['river_flow']} m³/s")
-            print(f"   ⏰ Time: {sensor_data['timestamp']}")
+            # Generate sensor data; obvious cases come with a local prediction
+            sensor_data, prediction = next_city_reading(city)
             
-            # Send to FastAPI
-            prediction = send_to_fastapi(sensor_data)
+            # Send ambiguous readings to FastAPI
+            if prediction is None:
+                prediction = await request_prediction(session, sensor_data)
             
             if prediction:
-                print(f"   🔎 Risk Assessment: {prediction['risk_level']}")
-                print(f"   📊 Confidence: {prediction['confidence']}%")
-                print(f"   📌 Reason: {prediction['reason']}")
-                print(f"   📝 Recommendation: {prediction['recommendation']}")
+                logger.info(
+                    "📡 %s %s | 💧 %s cm 🌧️ %s mm 🌊 %s m³/s | 🔎 %s (%s%%) | 📌 %s | 📝 %s",
+                    city, sensor_data['timestamp'], sensor_data['water_level'],
+                    sensor_data['rainfall'], sensor_data['river_flow'],
+                    prediction['risk_level'], prediction['confidence'],
+                    prediction['reason'], prediction['recommendation']
+                )
                 
                 if prediction['risk_level'] == 'HIGH':
-                    print("🚨 HIGH FLOOD RISK DETECTED - IMMEDIATE ACTION REQUIRED 🚨")
-                    print(f"   ☎️ Emergency Helplines:\n{prediction['helpline']}")
+                    logger.warning(
+                        "🚨 HIGH FLOOD RISK DETECTED in %s - IMMEDIATE ACTION REQUIRED 🚨 ☎️ Helplines: %s",
+                        city, prediction['helpline']
+                    )
                 
                 # Save to database
                 save_sensor_data(city, sensor_data, prediction)
                 
             else:
-                print("   ⚠️ Failed to get prediction from API")
+                logger.info(
+                    "📡 %s %s | 💧 %s cm 🌧️ %s mm 🌊 %s m³/s | ⚠️ Failed to get prediction from API",
+                    city, sensor_data['timestamp'], sensor_data['water_level'],
+                    sensor_data['rainfall'], sensor_data['river_flow']
+                )
                 save_sensor_data(city, sensor_data)
             
             # Wait before next reading
-            time.sleep(interval)
+            await asyncio.sleep(interval)
             
-        except KeyboardInterrupt:
-            print(f"\n🛑 Stopping simulation for {city}")
-            break
         except Exception as e:
-            print(f"❌ Error in {city} simulation: {e}")
-            time.sleep(5)
+            logger.error("❌ Error in %s simulation: %s", city, e)
+            await asyncio.sleep(5)
 
-def run_multi_city_simulation():
-    """Run simulation for multiple cities simultaneously."""
-    print("🌊 JalRakshā AI - Enhanced IoT Flood Monitoring Simulator")
-    print("=" * 60)
-    print(f"📊 Monitoring {len(INDIAN_CITIES)} Indian cities")
-    print(f"🔗 FastAPI Backend: {FASTAPI_URL}")
-    print(f"📱 Monitoring API: {MONITORING_URL}")
-    print("=" * 60)
-    
-    # Initialize database
-    init_database()
-    
-    # Start monitoring threads for each city
-    threads = []
+async def _monitor_all_cities():
+    """Drive every city's simulation from a single event loop."""
+    global _pred_queue
     
-    for city in INDIAN_CITIES.keys():
-        # Random interval between 20-60 seconds for each city
-        interval = random.randint(20, 60)
-        thread = threading.Thread(
-            target=simulate_city_monitoring,
-            args=(city, interval),
-            daemon=True
-        )
-        thread.start()
-        threads.append(thread)
-        print(f"🚀 Started monitoring thread for {city} (interval: {interval}s)")
-        time.sleep(1)  # Stagger thread starts
-    
-    print(f"\n✅ All {len(threads)} monitoring threads started successfully!")
-    print("🔄 Real-time flood monitoring is now active...")
-    print("📱 Check the React frontend at http://localhost:3000")
-    print("🔧 API documentation at http://localhost:8000/docs")
-    print("\nPress Ctrl+C to stop all monitoring...")
-    
-    try:
-        # Keep main thread alive
+    async with create_session() as session:
+        # Predictions from every city go through one batch dispatcher
+        _pred_queue = asyncio.Queue()
+        refresh_readings()  # First round is ready before any city starts
+        tasks = {asyncio.create_task(batch_dispatcher(session, _pred_queue))}
+        
+        def start_city(city: str, interval: int):
+            tasks.add(asyncio.create_task(simulate_city_monitoring(city, session, interval)))
+        
+        # Schedule every city on the loop's timer at a random phase within its
+        # interval, so readings are spread out without a start-up ramp
+        loop = asyncio.get_running_loop()
+        for city in CITY_NAMES:
+            # Random interval between 20-60 seconds for each city
+            interval = random.randint(20, 60)
+            loop.call_later(random.random() * interval, start_city, city, interval)
+            print(f"🚀 Scheduled monitoring for {city} (interval: {interval}s)")
+        
+        print(f"\n✅ All {len(CITY_NAMES)} city monitors scheduled successfully!")
+        print("🔄 Real-time flood monitoring is now active...")
+        print("📱 Check the React frontend at http://localhost:3000")
+        print("🔧 API documentation at http://localhost:8000/docs")
+        print("\nPress Ctrl+C to stop all monitoring...")
+        
         while True:
-            time.sleep(10)
+            await asyncio.sleep(10)
             
             # Show periodic status update
-            status = get_monitoring_status()
+            status = await get_monitoring_status(session)
             if status:
                 print(f"\n📊 Status Update:")
                 print(f"   🏙️ Cities Monitored: {status['total_cities']}")
@@ -312,25 +538,51 @@ def run_multi_city_simulation():
                 print(f"   ⚠️ Medium Risk: {status['medium_risk_count']}")
                 print(f"   ✅ Low Risk: {status['low_risk_count']}")
                 print(f"   ⏰ Last Updated: {status['last_updated']}")
-            
+
+async def _monitor_single_city(city: str, interval: int):
+    """Drive one city's simulation with its own session."""
+    refresh_readings()
+    async with create_session() as session:
+        await simulate_city_monitoring(city, session, interval)
+
+def run_multi_city_simulation():
+    """Run simulation for multiple cities simultaneously."""
+    print("🌊 JalRakshā AI - Enhanced IoT Flood Monitoring Simulator")
+    print("=" * 60)
+    print(f"📊 Monitoring {len(CITY_NAMES)} Indian cities")
+    print(f"🔗 FastAPI Backend: {FASTAPI_URL}")
+    print(f"📱 Monitoring API: {MONITORING_URL}")
+    print("=" * 60)
+    
+    # Initialize logging and database
+    setup_logging()
+    init_database()
+    
+    try:
+        asyncio.run(_monitor_all_cities())
     except KeyboardInterrupt:
         print("\n🛑 Shutting down IoT simulator...")
-        print("👋 All monitoring threads stopped. Goodbye!")
+        print("👋 All city monitors stopped. Goodbye!")
 
 def run_single_city_simulation(city: str = None):
     """Run simulation for a single city."""
     if not city:
-        city = random.choice(list(INDIAN_CITIES.keys()))
+        city = random.choice(CITY_NAMES)
+    city = sys.intern(city)
     
-    if city not in INDIAN_CITIES:
+    if city not in CITY_IDX:
         print(f"❌ City '{city}' not found in database")
         return
     
     print(f"🌊 Single City IoT Simulation: {city}")
     print("=" * 40)
     
+    setup_logging()
     init_database()
-    simulate_city_monitoring(city, 15)  # 15-second intervals for single city
+    try:
+        asyncio.run(_monitor_single_city(city, 15))  # 15-second intervals for single city
+    except KeyboardInterrupt:
+        print(f"\n🛑 Stopping simulation for {city}")
 
 # ---------------------------
 # Main Execution
@@ -349,7 +601,7 @@ if __name__ == "__main__":
             print("  python enhanced_iot_simulator.py --single      # Run single city simulation")
             print("  python enhanced_iot_simulator.py --single Mumbai  # Run simulation for Mumbai")
             print("  python enhanced_iot_simulator.py --help       # Show this help")
-            print(f"\nAvailable cities: {', '.join(INDIAN_CITIES.keys())}")
+            print(f"\nAvailable cities: {', '.join(CITY_NAMES)}")
         else:
             print("❌ Unknown argument. Use --help for usage information.")
     else:
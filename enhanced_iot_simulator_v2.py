@@ -4,21 +4,61 @@ Advanced simulation with LoRaWAN/MQTT protocols and real-time sensor health moni
 """
 
 import asyncio
+import bisect
+import itertools
 import json
 import random
+import sys
 import time
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-import requests
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import aiohttp
+import numpy as np
+import orjson
 import sqlite3
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+try:
+    import numba
+except ImportError:  # JIT value kernel is optional
+    numba = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+if numba is not None:
+    @numba.njit(cache=True, boundscheck=False)
+    def _step_values(base, var, trend, lo, hi, hour_frac, rand):
+        """Fused trend, variation and clip over all sensors in a single loop"""
+        values = np.empty(base.shape[0])
+        for i in range(base.shape[0]):
+            value = base[i] + trend[i] * hour_frac + (2.0 * rand[i] - 1.0) * var[i]
+            values[i] = min(hi[i], max(lo[i], value))
+        return values
+
+# Realistic (min, max, unit) per sensor type
+_BOUNDS: Dict[str, Tuple[float, float, str]] = {
+    "water_level": (0.0, 15.0, "m"),       # 0-15 meters
+    "rainfall": (0.0, 200.0, "mm/hr"),     # 0-200 mm/hr
+    "river_flow": (0.0, 1.0, "ratio"),     # 0-1 (normalized)
+    "drainage": (0.0, 1.0, "ratio")        # 0-1 (normalized)
+}
+_UNBOUNDED = (float("-inf"), float("inf"), "units")
+
+# Fixed choices for simulated packet and reading metadata
+_LORA_FREQ = ("868.1", "868.3", "868.5")
+_LORA_SF = (7, 8, 9)
+_QUALITY = ("good", "fair", "excellent")
+_CALIB = ("calibrated", "needs_calibration")
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Slotted dataclasses need Python 3.10+; older interpreters fall back to a per-instance __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class SensorSimulation:
     """Sensor simulation configuration"""
     node_id: str
@@ -33,191 +73,201 @@ class SensorSimulation:
     trend_factor: float
     last_value: float = 0.0
     last_update: Optional[datetime] = None
+    _mqtt_topic: str = field(init=False, repr=False)
+    _auth: str = field(init=False, repr=False)
+    _http_headers: Dict[str, str] = field(init=False, repr=False)
+    _location: Dict[str, float] = field(init=False, repr=False)
+    _send: Optional[Callable] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Static per-sensor packet fragments, built once instead of per transmission
+        self._mqtt_topic = f"jalraksha/sensors/{self.node_id}/data"
+        self._auth = f"Bearer sensor_{self.node_id}"
+        self._http_headers = {
+            "Content-Type": "application/json",
+            "Authorization": self._auth,
+            "User-Agent": f"IoT-Sensor/{self.node_id}"
+        }
+        self._location = {"lat": self.lat, "lng": self.lng}
+
+class VirtualClock:
+    """Discrete-event clock: simulated delays advance virtual time instead of sleeping"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self._horizon = 0.0
+    
+    async def advance(self, delay: float):
+        """Wait `delay` virtual seconds from the current step, yielding to other tasks"""
+        self._horizon = max(self._horizon, self.now + delay)
+        await asyncio.sleep(0)
+    
+    def settle(self):
+        """Close the current step: concurrent waits end at the latest one"""
+        self.now = self._horizon
 
 class IoTProtocolSimulator:
     """Simulate different IoT protocols (LoRaWAN, MQTT, HTTP)"""
     
-    def __init__(self):
+    # Simulated network delay ranges in seconds; zero them out for benchmark runs
+    MQTT_DELAY = (0.1, 0.5)
+    LORAWAN_DELAY = (0.5, 2.0)
+    HTTP_DELAY = (0.2, 1.0)
+    
+    def __init__(self, vclock: Optional[VirtualClock] = None):
         self.mqtt_broker = "localhost"
         self.mqtt_port = 1883
         self.lorawan_gateway = "http://localhost:8080/api/lorawan"
         self.http_endpoint = "http://localhost:8000/api/v1/iot/sensor-data"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._rng = random.Random()
+        self.vclock = vclock
+    
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared keep-alive HTTP session, created on first use inside the event loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+    
+    async def network_delay(self, delay_range: tuple):
+        """Simulate transmission delay, in virtual time when a clock is attached"""
+        delay = self._rng.uniform(*delay_range)
+        if self.vclock is not None:
+            await self.vclock.advance(delay)
+        else:
+            await asyncio.sleep(delay)
         
-    async def simulate_mqtt_sensor(self, sensor: SensorSimulation) -> Dict[str, Any]:
+    async def simulate_mqtt_sensor(self, sensor: SensorSimulation, ts_ms: int) -> Dict[str, Any]:
         """Simulate MQTT sensor data transmission"""
-        try:
-            # Generate realistic sensor data
-            sensor_data = await self.generate_sensor_data(sensor)
-            
-            # Simulate MQTT message format
-            mqtt_message = {
-                "topic": f"jalraksha/sensors/{sensor.node_id}/data",
-                "payload": {
-                    "node_id": sensor.node_id,
-                    "timestamp": datetime.now().isoformat(),
-                    "sensor_type": sensor.sensor_type,
-                    "data": sensor_data,
-                    "battery_level": random.uniform(20, 100),
-                    "signal_strength": random.uniform(-80, -30),
-                    "packet_loss": random.uniform(0, 5)
-                },
-                "qos": 1,
-                "retain": False
-            }
-            
-            # Simulate network delay
-            await asyncio.sleep(random.uniform(0.1, 0.5))
-            
-            # Forward to main system
-            await self.forward_to_system(sensor.node_id, sensor_data, "mqtt")
-            
-            logger.info(f"📡 MQTT sensor {sensor.node_id} transmitted data")
-            return mqtt_message
-            
-        except Exception as e:
-            logger.error(f"❌ MQTT simulation error for {sensor.node_id}: {str(e)}")
-            return {}
+        # Generate realistic sensor data
+        sensor_data = await self.generate_sensor_data(sensor, ts_ms)
+        
+        # Simulate MQTT message format
+        mqtt_message = {
+            "topic": sensor._mqtt_topic,
+            "payload": {
+                "node_id": sensor.node_id,
+                "timestamp": ts_ms,
+                "sensor_type": sensor.sensor_type,
+                "data": sensor_data,
+                "battery_level": self._rng.uniform(20, 100),
+                "signal_strength": self._rng.uniform(-80, -30),
+                "packet_loss": self._rng.uniform(0, 5)
+            },
+            "qos": 1,
+            "retain": False
+        }
+        
+        # Simulate network delay
+        await self.network_delay(self.MQTT_DELAY)
+        
+        # Forward to main system
+        await self.forward_to_system(sensor.node_id, sensor_data, "mqtt", ts_ms)
+        
+        logger.info(f"📡 MQTT sensor {sensor.node_id} transmitted data")
+        return mqtt_message
     
-    async def simulate_lorawan_sensor(self, sensor: SensorSimulation) -> Dict[str, Any]:
+    async def simulate_lorawan_sensor(self, sensor: SensorSimulation, ts_ms: int) -> Dict[str, Any]:
         """Simulate LoRaWAN sensor data transmission"""
-        try:
-            # Generate realistic sensor data
-            sensor_data = await self.generate_sensor_data(sensor)
-            
-            # Simulate LoRaWAN packet format
-            lorawan_packet = {
-                "gateway_id": f"GW_{random.randint(1000, 9999)}",
-                "node_id": sensor.node_id,
-                "timestamp": datetime.now().isoformat(),
-                "frequency": random.choice(["868.1", "868.3", "868.5"]),
-                "spreading_factor": random.choice([7, 8, 9]),
-                "coding_rate": "4/5",
-                "rssi": random.uniform(-120, -60),
-                "snr": random.uniform(-20, 20),
-                "data": {
-                    "sensor_type": sensor.sensor_type,
-                    "value": sensor_data,
-                    "battery_level": random.uniform(15, 95),
-                    "temperature": random.uniform(-10, 50)
-                }
+        # Generate realistic sensor data
+        sensor_data = await self.generate_sensor_data(sensor, ts_ms)
+        
+        # Simulate LoRaWAN packet format
+        lorawan_packet = {
+            "gateway_id": f"GW_{self._rng.randint(1000, 9999)}",
+            "node_id": sensor.node_id,
+            "timestamp": ts_ms,
+            "frequency": _LORA_FREQ[self._rng.randrange(3)],
+            "spreading_factor": _LORA_SF[self._rng.randrange(3)],
+            "coding_rate": "4/5",
+            "rssi": self._rng.uniform(-120, -60),
+            "snr": self._rng.uniform(-20, 20),
+            "data": {
+                "sensor_type": sensor.sensor_type,
+                "value": sensor_data,
+                "battery_level": self._rng.uniform(15, 95),
+                "temperature": self._rng.uniform(-10, 50)
             }
-            
-            # Simulate LoRaWAN transmission delay
-            await asyncio.sleep(random.uniform(0.5, 2.0))
-            
-            # Forward to main system
-            await self.forward_to_system(sensor.node_id, sensor_data, "lorawan")
-            
-            logger.info(f"📡 LoRaWAN sensor {sensor.node_id} transmitted data")
-            return lorawan_packet
-            
-        except Exception as e:
-            logger.error(f"❌ LoRaWAN simulation error for {sensor.node_id}: {str(e)}")
-            return {}
+        }
+        
+        # Simulate LoRaWAN transmission delay
+        await self.network_delay(self.LORAWAN_DELAY)
+        
+        # Forward to main system
+        await self.forward_to_system(sensor.node_id, sensor_data, "lorawan", ts_ms)
+        
+        logger.info(f"📡 LoRaWAN sensor {sensor.node_id} transmitted data")
+        return lorawan_packet
     
-    async def simulate_http_sensor(self, sensor: SensorSimulation) -> Dict[str, Any]:
+    async def simulate_http_sensor(self, sensor: SensorSimulation, ts_ms: int) -> Dict[str, Any]:
         """Simulate HTTP sensor data transmission"""
-        try:
-            # Generate realistic sensor data
-            sensor_data = await self.generate_sensor_data(sensor)
-            
-            # Simulate HTTP request
-            http_request = {
-                "method": "POST",
-                "url": self.http_endpoint,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer sensor_{sensor.node_id}",
-                    "User-Agent": f"IoT-Sensor/{sensor.node_id}"
-                },
-                "payload": {
-                    "node_id": sensor.node_id,
-                    "protocol": "http",
-                    "timestamp": datetime.now().isoformat(),
-                    "data": sensor_data,
-                    "location": {
-                        "lat": sensor.lat,
-                        "lng": sensor.lng
-                    },
-                    "metadata": {
-                        "firmware_version": "1.2.3",
-                        "uptime": random.randint(1000, 86400),
-                        "error_count": random.randint(0, 5)
-                    }
+        # Generate realistic sensor data
+        sensor_data = await self.generate_sensor_data(sensor, ts_ms)
+        
+        # Simulate HTTP request
+        http_request = {
+            "method": "POST",
+            "url": self.http_endpoint,
+            "headers": sensor._http_headers,
+            "payload": {
+                "node_id": sensor.node_id,
+                "protocol": "http",
+                "timestamp": ts_ms,
+                "data": sensor_data,
+                "location": sensor._location,
+                "metadata": {
+                    "firmware_version": "1.2.3",
+                    "uptime": self._rng.randint(1000, 86400),
+                    "error_count": self._rng.randint(0, 5)
                 }
             }
-            
-            # Simulate HTTP transmission
-            await asyncio.sleep(random.uniform(0.2, 1.0))
-            
-            # Forward to main system
-            await self.forward_to_system(sensor.node_id, sensor_data, "http")
-            
-            logger.info(f"📡 HTTP sensor {sensor.node_id} transmitted data")
-            return http_request
-            
-        except Exception as e:
-            logger.error(f"❌ HTTP simulation error for {sensor.node_id}: {str(e)}")
-            return {}
+        }
+        
+        # Simulate HTTP transmission
+        await self.network_delay(self.HTTP_DELAY)
+        
+        # Forward to main system
+        await self.forward_to_system(sensor.node_id, sensor_data, "http", ts_ms)
+        
+        logger.info(f"📡 HTTP sensor {sensor.node_id} transmitted data")
+        return http_request
     
-    async def generate_sensor_data(self, sensor: SensorSimulation) -> Dict[str, Any]:
-        """Generate realistic sensor data based on type"""
-        try:
-            current_time = datetime.now()
-            
-            # Apply trend and variation
-            trend = sensor.trend_factor * (current_time.hour / 24.0)  # Daily trend
-            variation = random.uniform(-sensor.variation_range, sensor.variation_range)
-            new_value = sensor.base_value + trend + variation
-            
-            # Ensure realistic bounds
-            if sensor.sensor_type == "water_level":
-                new_value = max(0, min(15, new_value))  # 0-15 meters
-                unit = "m"
-            elif sensor.sensor_type == "rainfall":
-                new_value = max(0, min(200, new_value))  # 0-200 mm/hr
-                unit = "mm/hr"
-            elif sensor.sensor_type == "river_flow":
-                new_value = max(0, min(1, new_value))  # 0-1 (normalized)
-                unit = "ratio"
-            elif sensor.sensor_type == "drainage":
-                new_value = max(0, min(1, new_value))  # 0-1 (normalized)
-                unit = "ratio"
-            else:
-                unit = "units"
-            
-            # Update sensor state
-            sensor.last_value = new_value
-            sensor.last_update = current_time
-            
-            return {
-                "value": round(new_value, 2),
-                "unit": unit,
-                "timestamp": current_time.isoformat(),
-                "quality": random.choice(["good", "fair", "excellent"]),
-                "calibration_status": random.choice(["calibrated", "needs_calibration"])
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Generate sensor data error: {str(e)}")
-            return {"value": 0, "unit": "error", "timestamp": datetime.now().isoformat()}
+    async def generate_sensor_data(self, sensor: SensorSimulation, ts_ms: int) -> Dict[str, Any]:
+        """Build the sensor data payload from the value generated for this cycle"""
+        unit = _BOUNDS.get(sensor.sensor_type, _UNBOUNDED)[2]
+        
+        return {
+            "value": round(sensor.last_value, 2),
+            "unit": unit,
+            "timestamp": ts_ms,
+            "quality": _QUALITY[self._rng.randrange(3)],
+            "calibration_status": _CALIB[self._rng.getrandbits(1)]
+        }
     
-    async def forward_to_system(self, node_id: str, data: Dict[str, Any], protocol: str):
+    async def forward_to_system(self, node_id: str, data: Dict[str, Any], protocol: str, ts_ms: int):
         """Forward sensor data to main JalRakshā system"""
         try:
             payload = {
                 "node_id": node_id,
                 "protocol": protocol,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": ts_ms,
                 "data": data
             }
             
-            response = requests.post(self.http_endpoint, json=payload, timeout=5)
-            
-            if response.status_code == 200:
-                logger.info(f"✅ Data forwarded to system for {node_id}")
-            else:
-                logger.error(f"❌ Failed to forward data for {node_id}: {response.status_code}")
+            async with self.session.post(self.http_endpoint, data=orjson.dumps(payload), headers=JSON_HEADERS,
+                                         timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    logger.info(f"✅ Data forwarded to system for {node_id}")
+                else:
+                    logger.error(f"❌ Failed to forward data for {node_id}: {response.status}")
                 
         except Exception as e:
             logger.error(f"❌ Forward data error for {node_id}: {str(e)}")
@@ -231,65 +281,99 @@ class SensorHealthSimulator:
             "offline": 0.10,  # 10% chance of being offline
             "error": 0.05     # 5% chance of having errors
         }
+        self._rng = random.Random()
+        
+        # Cumulative thresholds for sampling a status with one bisect
+        self._cum = tuple(itertools.accumulate(self.health_probabilities.values()))
+        self._labels = tuple(self.health_probabilities.keys())
+        probabilities = np.array(tuple(self.health_probabilities.values()))
+        self._p = probabilities / probabilities.sum()
     
-    async def simulate_sensor_health(self, sensor: SensorSimulation) -> Dict[str, Any]:
+    async def simulate_sensor_health(self, sensor: SensorSimulation, ts_ms: int) -> Dict[str, Any]:
         """Simulate sensor health status"""
-        try:
-            # Determine health status based on probabilities
-            rand = random.random()
-            cumulative = 0
-            
-            for status, probability in self.health_probabilities.items():
-                cumulative += probability
-                if rand <= cumulative:
-                    health_status = status
-                    break
-            else:
-                health_status = "online"
-            
-            # Calculate health score
-            if health_status == "online":
-                health_score = random.randint(80, 100)
-            elif health_status == "offline":
-                health_score = random.randint(0, 30)
-            else:  # error
-                health_score = random.randint(30, 70)
-            
-            # Generate health details
-            health_data = {
-                "status": health_status,
-                "health_score": health_score,
-                "last_seen": datetime.now().isoformat(),
-                "battery_level": random.uniform(10, 100),
-                "signal_strength": random.uniform(-120, -30),
-                "error_count": random.randint(0, 10),
-                "uptime": random.randint(1000, 86400),
-                "temperature": random.uniform(-10, 60),
-                "humidity": random.uniform(20, 90)
-            }
-            
-            return health_data
-            
-        except Exception as e:
-            logger.error(f"❌ Health simulation error: {str(e)}")
-            return {"status": "error", "health_score": 0}
+        # Determine health status based on probabilities
+        index = bisect.bisect_left(self._cum, self._rng.random())
+        health_status = self._labels[index] if index < len(self._labels) else "online"
+        
+        # Calculate health score
+        if health_status == "online":
+            health_score = self._rng.randint(80, 100)
+        elif health_status == "offline":
+            health_score = self._rng.randint(0, 30)
+        else:  # error
+            health_score = self._rng.randint(30, 70)
+        
+        # Generate health details
+        health_data = {
+            "status": health_status,
+            "health_score": health_score,
+            "last_seen": ts_ms,
+            "battery_level": self._rng.uniform(10, 100),
+            "signal_strength": self._rng.uniform(-120, -30),
+            "error_count": self._rng.randint(0, 10),
+            "uptime": self._rng.randint(1000, 86400),
+            "temperature": self._rng.uniform(-10, 60),
+            "humidity": self._rng.uniform(20, 90)
+        }
+        
+        return health_data
+    
+    async def simulate_health_batch(self, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Simulate health status for n sensors at once, one array per health field"""
+        status_idx = rng.choice(len(self._labels), size=n, p=self._p)
+        m_on = status_idx == 0
+        m_off = status_idx == 1
+        
+        # Health score range depends on status: online 80-100, offline 0-30, error 30-70
+        health_score = np.where(
+            m_on, rng.integers(80, 101, size=n),
+            np.where(m_off, rng.integers(0, 31, size=n), rng.integers(30, 71, size=n))
+        )
+        
+        return {
+            "status": np.array(self._labels)[status_idx],
+            "health_score": health_score,
+            "battery_level": rng.uniform(10, 100, size=n),
+            "signal_strength": rng.uniform(-120, -30, size=n),
+            "error_count": rng.integers(0, 11, size=n),
+            "uptime": rng.integers(1000, 86401, size=n),
+            "temperature": rng.uniform(-10, 60, size=n),
+            "humidity": rng.uniform(20, 90, size=n)
+        }
 
 class EnhancedIoTSimulator:
     """Enhanced IoT Simulator with multiple protocols and health monitoring"""
     
-    def __init__(self):
-        self.protocol_simulator = IoTProtocolSimulator()
+    def __init__(self, virtual_time_mode: bool = False):
+        self.virtual_time_mode = virtual_time_mode
+        self._vclock = VirtualClock() if virtual_time_mode else None
+        self.protocol_simulator = IoTProtocolSimulator(self._vclock)
         self.health_simulator = SensorHealthSimulator()
         self.sensors: List[SensorSimulation] = []
+        self._rng = np.random.default_rng()
         self.simulation_interval = 30  # seconds
         self.database_path = "iot_simulation.db"
+        self.log_batch_size = 100  # rows per write transaction
+        self.log_flush_interval = 1.0  # seconds
+        self._log_q: asyncio.Queue = asyncio.Queue()
+        self.max_in_flight = 100  # sensor workers, matches the HTTP connection pool limit
+        self._work_q: asyncio.Queue = asyncio.Queue()
+        self.stats_ttl = 5.0  # seconds a stats snapshot is reused
+        self.retention_days = 7  # log rows older than this are deleted
+        self.retention_interval = 3600  # seconds between retention sweeps
+        self._stats_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._conn = sqlite3.connect(self.database_path, isolation_level=None, check_same_thread=False)
         self.init_database()
         
     def init_database(self):
         """Initialize simulation database"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
+            cursor = self._conn.cursor()
+            # Page size and auto-vacuum only take effect before the first table is created
+            cursor.execute("PRAGMA page_size=8192")
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
             
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS sensor_simulation_log (
@@ -304,8 +388,15 @@ class EnhancedIoTSimulator:
                 )
             ''')
             
-            conn.commit()
-            conn.close()
+            # Covering index for the grouped statistics query
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_log_dims
+                ON sensor_simulation_log(protocol, sensor_type, health_status)
+            ''')
+            
+            # Index for time-windowed queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_ts ON sensor_simulation_log(timestamp)")
+            
             logger.info("✅ IoT simulation database initialized")
             
         except Exception as e:
@@ -365,111 +456,239 @@ class EnhancedIoTSimulator:
             # Combine all sensors
             self.sensors = water_sensors + rainfall_sensors + river_flow_sensors + drainage_sensors
             
+            # Bind each sensor's protocol handler once instead of dispatching per cycle
+            table = {
+                "mqtt": self.protocol_simulator.simulate_mqtt_sensor,
+                "lorawan": self.protocol_simulator.simulate_lorawan_sensor,
+                "http": self.protocol_simulator.simulate_http_sensor
+            }
+            for sensor in self.sensors:
+                sensor._send = table.get(sensor.protocol)
+            
+            # Per-sensor parameters as aligned arrays for vectorized value generation
+            self.base = np.array([s.base_value for s in self.sensors])
+            self.var = np.array([s.variation_range for s in self.sensors])
+            self.trend = np.array([s.trend_factor for s in self.sensors])
+            bounds = [_BOUNDS.get(s.sensor_type, _UNBOUNDED) for s in self.sensors]
+            self.lo = np.array([b[0] for b in bounds])
+            self.hi = np.array([b[1] for b in bounds])
+            
             logger.info(f"✅ Created sensor network with {len(self.sensors)} sensors")
             
         except Exception as e:
             logger.error(f"❌ Create sensor network error: {str(e)}")
     
-    async def simulate_sensor_data(self, sensor: SensorSimulation):
+    def generate_cycle_values(self, current_time: datetime, hour_frac: float):
+        """Generate this cycle's readings for all sensors in one vectorized pass"""
+        # Apply daily trend and variation, then clip to realistic bounds
+        if numba is not None:
+            rand = self._rng.random(len(self.sensors))
+            values = _step_values(self.base, self.var, self.trend, self.lo, self.hi, hour_frac, rand)
+        else:
+            variation = self._rng.uniform(-self.var, self.var)
+            values = np.clip(self.base + self.trend * hour_frac + variation, self.lo, self.hi)
+        
+        # Update sensor state
+        for sensor, value in zip(self.sensors, values.tolist()):
+            sensor.last_value = value
+            sensor.last_update = current_time
+    
+    async def simulate_sensor_data(self, sensor: SensorSimulation, ts_ms: int, health_data: Dict[str, Any]):
         """Simulate data transmission for a single sensor"""
-        try:
-            # Simulate health status
-            health_data = await self.health_simulator.simulate_sensor_health(sensor)
-            
-            # Only transmit data if sensor is online
-            if health_data["status"] == "online":
-                # Simulate data transmission based on protocol
-                if sensor.protocol == "mqtt":
-                    transmission_data = await self.protocol_simulator.simulate_mqtt_sensor(sensor)
-                elif sensor.protocol == "lorawan":
-                    transmission_data = await self.protocol_simulator.simulate_lorawan_sensor(sensor)
-                elif sensor.protocol == "http":
-                    transmission_data = await self.protocol_simulator.simulate_http_sensor(sensor)
-                else:
-                    logger.warning(f"⚠️ Unknown protocol for sensor {sensor.node_id}")
-                    return
-                
-                # Log simulation data
-                await self.log_simulation_data(sensor, health_data)
-                
-            else:
-                logger.warning(f"⚠️ Sensor {sensor.node_id} is {health_data['status']}")
-                
-        except Exception as e:
-            logger.error(f"❌ Sensor simulation error for {sensor.node_id}: {str(e)}")
+        # Only transmit data if sensor is online
+        if health_data["status"] == "online":
+            # Simulate data transmission with the protocol handler bound at network creation
+            if sensor._send is None:
+                logger.warning(f"⚠️ Unknown protocol for sensor {sensor.node_id}")
+                return
+            await sensor._send(sensor, ts_ms)
+            
+            # Log simulation data
+            await self.log_simulation_data(sensor, health_data)
+            
+        else:
+            logger.warning(f"⚠️ Sensor {sensor.node_id} is {health_data['status']}")
     
     async def log_simulation_data(self, sensor: SensorSimulation, health_data: Dict[str, Any]):
-        """Log simulation data to database"""
+        """Queue simulation data for the background database writer"""
+        self._log_q.put_nowait((
+            sensor.node_id,
+            sensor.sensor_type,
+            sensor.protocol,
+            sensor.last_value,
+            health_data["status"],
+            health_data["health_score"]
+        ))
+    
+    def _flush_log(self, batch: List[tuple]):
+        """Write a batch of queued log rows in a single transaction"""
+        cursor = self._conn.cursor()
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            cursor.execute("BEGIN")
+            cursor.executemany('''
                 INSERT INTO sensor_simulation_log 
                 (node_id, sensor_type, protocol, data_value, health_status, health_score)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                sensor.node_id,
-                sensor.sensor_type,
-                sensor.protocol,
-                sensor.last_value,
-                health_data["status"],
-                health_data["health_score"]
-            ))
+            ''', batch)
+            cursor.execute("COMMIT")
+        
+        except Exception as e:
+            if self._conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            logger.error(f"❌ Log simulation data error: {str(e)}")
+    
+    async def _log_writer(self):
+        """Flush queued log rows every log_batch_size rows or log_flush_interval seconds.
+        
+        A None row stops the writer after flushing everything queued before it.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._log_q.get()
+            batch: List[tuple] = []
+            deadline = loop.time() + self.log_flush_interval
+            
+            while row is not None:
+                batch.append(row)
+                timeout = deadline - loop.time()
+                if len(batch) >= self.log_batch_size or timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._log_q.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
             
-            conn.commit()
-            conn.close()
+            if batch:
+                self._flush_log(batch)
+            if row is None:
+                return
+    
+    def _apply_retention(self):
+        """Delete log rows past the retention window and return freed pages to the OS"""
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute(
+                "DELETE FROM sensor_simulation_log WHERE timestamp < datetime('now', ?)",
+                (f"-{self.retention_days} days",)
+            )
+            if cursor.rowcount > 0:
+                logger.info(f"🧹 Removed {cursor.rowcount} simulation log rows older than {self.retention_days} days")
+            cursor.execute("PRAGMA incremental_vacuum(1000)")
             
         except Exception as e:
-            logger.error(f"❌ Log simulation data error: {str(e)}")
+            logger.error(f"❌ Log retention error: {str(e)}")
+    
+    async def _retention(self):
+        """Periodically cap sensor_simulation_log to the retention window"""
+        while True:
+            self._apply_retention()
+            await asyncio.sleep(self.retention_interval)
+    
+    async def _sensor_worker(self):
+        """Process queued sensor transmissions until cancelled"""
+        while True:
+            sensor, ts_ms, health_data = await self._work_q.get()
+            try:
+                await self.simulate_sensor_data(sensor, ts_ms, health_data)
+            except Exception as e:
+                # Single error boundary for the whole per-sensor path
+                logger.error(f"❌ Sensor simulation error for {sensor.node_id}: {e!r}")
+            finally:
+                self._work_q.task_done()
     
     async def run_simulation(self):
         """Run continuous IoT simulation"""
+        log_writer = None
+        retention = None
+        workers: List[asyncio.Task] = []
         try:
             logger.info("🌊 Starting Enhanced IoT Simulator...")
             
+            # Start background database writer
+            log_writer = asyncio.create_task(self._log_writer())
+            retention = asyncio.create_task(self._retention())
+            
             # Create sensor network
             self.create_sensor_network()
             
+            # Start a fixed pool of sensor workers, bounding transmissions in flight
+            workers = [
+                asyncio.create_task(self._sensor_worker())
+                for _ in range(min(self.max_in_flight, len(self.sensors)))
+            ]
+            
             # Run simulation loop
+            started = datetime.now()
             while True:
                 logger.info(f"🔄 Running simulation cycle for {len(self.sensors)} sensors...")
                 
-                # Simulate all sensors concurrently
-                tasks = [self.simulate_sensor_data(sensor) for sensor in self.sensors]
-                await asyncio.gather(*tasks, return_exceptions=True)
+                # One timestamp for the whole cycle
+                if self._vclock is not None:
+                    now = started + timedelta(seconds=self._vclock.now)
+                else:
+                    now = datetime.now()
+                ts_ms = int(now.timestamp() * 1000)  # epoch milliseconds for payloads
+                hour_frac = now.hour / 24.0  # daily trend position
+                
+                # Generate all sensor readings for this cycle
+                self.generate_cycle_values(now, hour_frac)
+                
+                # Simulate health status for all sensors, then split into per-sensor rows
+                health = await self.health_simulator.simulate_health_batch(len(self.sensors), self._rng)
+                columns = {key: values.tolist() for key, values in health.items()}
+                health_rows = [dict(zip(columns, row), last_seen=ts_ms) for row in zip(*columns.values())]
+                
+                # Simulate all sensors concurrently on the worker pool
+                for sensor, health_data in zip(self.sensors, health_rows):
+                    self._work_q.put_nowait((sensor, ts_ms, health_data))
+                await self._work_q.join()
                 
                 # Wait for next cycle
-                await asyncio.sleep(self.simulation_interval)
+                if self._vclock is not None:
+                    self._vclock.settle()
+                    await self._vclock.advance(self.simulation_interval)
+                    self._vclock.settle()
+                else:
+                    await asyncio.sleep(self.simulation_interval)
                 
         except KeyboardInterrupt:
             logger.info("🛑 IoT Simulator stopped by user")
         except Exception as e:
             logger.error(f"❌ Simulation error: {str(e)}")
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self.protocol_simulator.close()
+            if retention is not None:
+                retention.cancel()
+                await asyncio.gather(retention, return_exceptions=True)
+            if log_writer is not None:
+                # Stop via sentinel rather than cancel() so pending rows are always flushed
+                self._log_q.put_nowait(None)
+                await log_writer
     
     async def get_simulation_stats(self) -> Dict[str, Any]:
         """Get simulation statistics"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
-            
-            # Get total simulations
-            cursor.execute("SELECT COUNT(*) FROM sensor_simulation_log")
-            total_simulations = cursor.fetchone()[0]
-            
-            # Get protocol distribution
-            cursor.execute("SELECT protocol, COUNT(*) FROM sensor_simulation_log GROUP BY protocol")
-            protocol_stats = dict(cursor.fetchall())
-            
-            # Get sensor type distribution
-            cursor.execute("SELECT sensor_type, COUNT(*) FROM sensor_simulation_log GROUP BY sensor_type")
-            sensor_type_stats = dict(cursor.fetchall())
+            cursor = self._conn.cursor()
             
-            # Get health status distribution
-            cursor.execute("SELECT health_status, COUNT(*) FROM sensor_simulation_log GROUP BY health_status")
-            health_stats = dict(cursor.fetchall())
+            # Get all distributions from a single grouped scan of the index
+            cursor.execute('''
+                SELECT protocol, sensor_type, health_status, COUNT(*)
+                FROM sensor_simulation_log
+                GROUP BY protocol, sensor_type, health_status
+            ''')
             
-            conn.close()
+            total_simulations = 0
+            protocol_stats: Dict[str, int] = {}
+            sensor_type_stats: Dict[str, int] = {}
+            health_stats: Dict[str, int] = {}
+            for protocol, sensor_type, health_status, count in cursor.fetchall():
+                total_simulations += count
+                protocol_stats[protocol] = protocol_stats.get(protocol, 0) + count
+                sensor_type_stats[sensor_type] = sensor_type_stats.get(sensor_type, 0) + count
+                health_stats[health_status] = health_stats.get(health_status, 0) + count
             
             return {
                 "total_simulations": total_simulations,
@@ -483,6 +702,17 @@ class EnhancedIoTSimulator:
         except Exception as e:
             logger.error(f"❌ Get simulation stats error: {str(e)}")
             return {}
+    
+    async def get_cached_simulation_stats(self) -> Dict[str, Any]:
+        """Get simulation statistics, reusing the snapshot from the current stats_ttl window"""
+        bucket = int(time.monotonic() // self.stats_ttl)
+        if self._stats_cache is not None and self._stats_cache[0] == bucket:
+            return self._stats_cache[1]
+        
+        stats = await self.get_simulation_stats()
+        if stats:
+            self._stats_cache = (bucket, stats)
+        return stats
 
 # Main execution
 async def main():
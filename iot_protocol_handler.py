@@ -4,13 +4,18 @@ Supports LoRaWAN, MQTT, and HTTP protocols for real IoT sensor integration
 """
 
 import asyncio
-import json
 import time
 import logging
+import signal
+import sys
+import threading
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+import aiohttp
+import numpy as np
+import orjson
 import paho.mqtt.client as mqtt
-import requests
 from dataclasses import dataclass
 import sqlite3
 
@@ -18,7 +23,79 @@ import sqlite3
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+JSON_HEADERS = {"Content-Type": "application/json"}
+SENSOR_DATA_BATCH_URL = "http://localhost:8000/api/v1/iot/sensor-data/batch"
+
+# MQTT topic layout: jalraksha/sensors/<node_id>/<data|status>
+TOPIC_PREFIX = "jalraksha/sensors/"
+DATA_TOPIC = TOPIC_PREFIX + "+/data"
+STATUS_TOPIC = TOPIC_PREFIX + "+/status"
+SENSOR_TOPICS = TOPIC_PREFIX + "+/+"
+
+# Shared keep-alive HTTP session for every handler, created inside the running loop
+_HTTP: Optional[aiohttp.ClientSession] = None
+HTTP_POOL_SIZE = 64  # connections in total
+HTTP_POOL_PER_HOST = 16  # connections per gateway/backend host
+HTTP_RETRIES = 2  # extra attempts after a connection failure
+HTTP_BACKOFF = 0.1  # seconds, doubled per retry
+
+def get_http() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use"""
+    global _HTTP
+    if _HTTP is None or _HTTP.closed:
+        _HTTP = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, limit_per_host=HTTP_POOL_PER_HOST,
+                                           keepalive_timeout=60, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=5)
+        )
+    return _HTTP
+
+async def http_post(url: str, data: bytes) -> Tuple[int, str]:
+    """POST a JSON body on the shared session, retrying connection failures with backoff"""
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            async with get_http().post(url, data=data, headers=JSON_HEADERS) as response:
+                # Read the body so the connection goes back to the pool
+                return response.status, await response.text()
+        except aiohttp.ClientConnectionError:
+            if attempt == HTTP_RETRIES:
+                raise
+            await asyncio.sleep(HTTP_BACKOFF * (2 ** attempt))
+
+async def close_http():
+    """Close the shared HTTP session"""
+    if _HTTP is not None and not _HTTP.closed:
+        await _HTTP.close()
+
+class IsoClock:
+    """Wall-clock ISO timestamp reformatted at most once per TICK instead of per message"""
+    
+    TICK = 0.01  # seconds a formatted timestamp is reused
+    
+    def __init__(self):
+        self._iso = datetime.now().isoformat()
+        self._formatted_at = time.monotonic()
+    
+    def now(self) -> str:
+        """Current timestamp, at most TICK seconds old"""
+        mono = time.monotonic()
+        if mono - self._formatted_at > self.TICK:
+            self._iso = datetime.now().isoformat()
+            self._formatted_at = mono
+        return self._iso
+
+ISO_CLOCK = IsoClock()
+
+def monotonic_to_iso(ts: Optional[float]) -> Optional[str]:
+    """Materialize a time.monotonic() reading as a wall-clock ISO timestamp"""
+    if ts is None or ts == -np.inf:
+        return None
+    return datetime.fromtimestamp(ts + time.time() - time.monotonic()).isoformat()
+
+# Slotted dataclasses need Python 3.10+; older interpreters fall back to a per-instance __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class SensorNode:
     """IoT Sensor Node Configuration"""
     node_id: str
@@ -28,50 +105,170 @@ class SensorNode:
     sensor_type: str  # 'water_level', 'rainfall', 'river_flow', 'drainage'
     protocol: str  # 'lorawan', 'mqtt', 'http'
     connection_params: Dict[str, Any]
-    last_seen: Optional[datetime] = None
-    status: str = 'offline'  # 'online', 'offline', 'error'
     data: Dict[str, Any] = None
 
+class NodeState:
+    """Hot per-node fields (last_seen, status) as parallel arrays indexed by node_id"""
+    
+    def __init__(self):
+        self.nodes: List[SensorNode] = []
+        self.index: Dict[str, int] = {}
+        self.last_seen = np.empty(0, dtype=np.float64)  # time.monotonic(), -inf until first message
+        self.status = np.empty(0, dtype=object)  # 'online', 'offline', 'error'
+    
+    def add(self, node: SensorNode) -> int:
+        """Give a node a slot in the state arrays (idempotent)"""
+        idx = self.index.get(node.node_id)
+        if idx is None:
+            idx = self.index[node.node_id] = len(self.nodes)
+            self.nodes.append(node)
+            self.last_seen = np.append(self.last_seen, -np.inf)
+            self.status = np.append(self.status, np.array(['offline'], dtype=object))
+        return idx
+    
+    def touch(self, node_id: str, status: str = 'online'):
+        """Record a message from a node"""
+        idx = self.index[node_id]
+        self.last_seen[idx] = time.monotonic()
+        self.status[idx] = status
+
+class SystemForwarder:
+    """Coalesce readings bound for the main JalRakshā system into batched HTTP requests"""
+    
+    MAX_BATCH = 128  # readings per request
+    BATCH_WINDOW = 0.02  # seconds to wait for more readings
+    
+    def __init__(self, protocol: str, url: str = SENSOR_DATA_BATCH_URL):
+        self.protocol = protocol
+        self.url = url
+        self._forward_q: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def submit(self, payload: Dict[str, Any]):
+        """Queue a payload, starting the background worker on first use"""
+        if self._worker is None:
+            self._forward_q = asyncio.Queue()
+            self._worker = asyncio.create_task(self._forward_worker())
+        await self._forward_q.put(payload)
+    
+    async def aclose(self):
+        """Flush queued payloads and stop the worker"""
+        if self._worker is not None:
+            # Stop via sentinel rather than cancel() so queued readings are still sent
+            await self._forward_q.put(None)
+            await self._worker
+            self._worker = None
+    
+    async def _forward_worker(self):
+        """Drain up to MAX_BATCH payloads per BATCH_WINDOW and post them together.
+        
+        A None payload stops the worker after everything queued before it is sent.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            payload = await self._forward_q.get()
+            batch: List[Dict[str, Any]] = []
+            deadline = loop.time() + self.BATCH_WINDOW
+            
+            while payload is not None:
+                batch.append(payload)
+                if len(batch) >= self.MAX_BATCH:
+                    break
+                if not self._forward_q.empty():
+                    payload = self._forward_q.get_nowait()
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    payload = await asyncio.wait_for(self._forward_q.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            
+            if batch:
+                await self._post_batch(batch)
+            if payload is None:
+                return
+    
+    async def _post_batch(self, batch: List[Dict[str, Any]]):
+        """Post one batch of payloads to the main system"""
+        try:
+            status, _ = await http_post(self.url, orjson.dumps({"batch": batch}))
+            if status == 200:
+                logger.info(f"✅ {len(batch)} {self.protocol} readings forwarded")
+            else:
+                logger.error(f"❌ Failed to forward {len(batch)} {self.protocol} readings: {status}")
+                    
+        except Exception as e:
+            logger.error(f"❌ {self.protocol} batch forward error: {str(e)}")
+
 class LoRaWANHandler:
     """LoRaWAN Protocol Handler for IoT Sensors"""
     
-    def __init__(self):
+    def __init__(self, node_state: Optional[NodeState] = None):
         self.gateway_url = "http://localhost:8080/api/lorawan"  # LoRaWAN Gateway
         self.active_nodes: Dict[str, SensorNode] = {}
+        self.node_state = node_state or NodeState()
+        self.forwarder = SystemForwarder("lorawan")
+    
+    def registration_payload(self, node: SensorNode) -> Dict[str, Any]:
+        """Build the gateway registration payload for a node"""
+        return {
+            "node_id": node.node_id,
+            "name": node.name,
+            "location": {"lat": node.lat, "lng": node.lng},
+            "sensor_type": node.sensor_type,
+            "frequency": node.connection_params.get("frequency", "868.1"),
+            "spreading_factor": node.connection_params.get("spreading_factor", 7)
+        }
     
     async def register_node(self, node: SensorNode) -> bool:
         """Register a LoRaWAN sensor node"""
         try:
-            payload = {
-                "node_id": node.node_id,
-                "name": node.name,
-                "location": {"lat": node.lat, "lng": node.lng},
-                "sensor_type": node.sensor_type,
-                "frequency": node.connection_params.get("frequency", "868.1"),
-                "spreading_factor": node.connection_params.get("spreading_factor", 7)
-            }
+            payload = self.registration_payload(node)
             
-            response = requests.post(f"{self.gateway_url}/register", json=payload, timeout=5)
-            if response.status_code == 200:
+            status, text = await http_post(f"{self.gateway_url}/register", orjson.dumps(payload))
+            if status == 200:
                 self.active_nodes[node.node_id] = node
+                self.node_state.add(node)
                 logger.info(f"✅ LoRaWAN node {node.node_id} registered successfully")
                 return True
             else:
-                logger.error(f"❌ Failed to register LoRaWAN node {node.node_id}: {response.text}")
+                logger.error(f"❌ Failed to register LoRaWAN node {node.node_id}: {text}")
                 return False
                 
         except Exception as e:
             logger.error(f"❌ LoRaWAN registration error for {node.node_id}: {str(e)}")
             return False
     
+    async def register_nodes(self, nodes: List[SensorNode]) -> bool:
+        """Register several LoRaWAN sensor nodes in one gateway request"""
+        if not nodes:
+            return True
+        try:
+            payload = {"nodes": [self.registration_payload(node) for node in nodes]}
+            
+            status, text = await http_post(f"{self.gateway_url}/register/bulk", orjson.dumps(payload))
+            if status == 200:
+                for node in nodes:
+                    self.active_nodes[node.node_id] = node
+                    self.node_state.add(node)
+                logger.info(f"✅ {len(nodes)} LoRaWAN nodes registered successfully")
+                return True
+            else:
+                logger.error(f"❌ Failed to register {len(nodes)} LoRaWAN nodes: {text}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"❌ LoRaWAN bulk registration error: {str(e)}")
+            return False
+    
     async def receive_data(self, node_id: str, data: Dict[str, Any]) -> bool:
         """Receive data from LoRaWAN sensor"""
         try:
             if node_id in self.active_nodes:
-                node = self.active_nodes[node_id]
-                node.last_seen = datetime.now()
-                node.status = 'online'
-                node.data = data
+                self.node_state.touch(node_id)
+                self.active_nodes[node_id].data = data
                 
                 # Forward to main system
                 await self.forward_to_system(node_id, data)
@@ -82,91 +279,143 @@ class LoRaWANHandler:
             logger.error(f"❌ LoRaWAN data receive error for {node_id}: {str(e)}")
             return False
     
+    async def aclose(self):
+        """Flush pending forwards"""
+        await self.forwarder.aclose()
+    
     async def forward_to_system(self, node_id: str, data: Dict[str, Any]):
-        """Forward LoRaWAN data to main JalRakshā system"""
-        try:
-            payload = {
-                "node_id": node_id,
-                "protocol": "lorawan",
-                "timestamp": datetime.now().isoformat(),
-                "data": data
-            }
-            
-            response = requests.post("http://localhost:8000/api/v1/iot/sensor-data", 
-                                  json=payload, timeout=5)
-            if response.status_code == 200:
-                logger.info(f"✅ LoRaWAN data forwarded for {node_id}")
-            else:
-                logger.error(f"❌ Failed to forward LoRaWAN data for {node_id}")
-                
-        except Exception as e:
-            logger.error(f"❌ LoRaWAN forward error for {node_id}: {str(e)}")
+        """Queue LoRaWAN data for batched forwarding to main JalRakshā system"""
+        await self.forwarder.submit({
+            "node_id": node_id,
+            "protocol": "lorawan",
+            "timestamp": ISO_CLOCK.now(),
+            "data": data
+        })
 
 class MQTTHandler:
     """MQTT Protocol Handler for IoT Sensors"""
     
-    def __init__(self, broker_host: str = "localhost", broker_port: int = 1883):
+    def __init__(self, broker_host: str = "localhost", broker_port: int = 1883,
+                 node_state: Optional[NodeState] = None):
         self.broker_host = broker_host
         self.broker_port = broker_port
-        self.client = mqtt.Client()
+        # Persistent session with a deep in-flight window so bursts are pipelined
+        self.client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id="jalraksha-iot",
+            clean_session=False,
+            transport="tcp"
+        )
+        self.client.max_inflight_messages_set(1000)
+        self.client.max_queued_messages_set(100000)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=8)
         self.active_nodes: Dict[str, SensorNode] = {}
+        self.node_state = node_state or NodeState()
+        self.forwarder = SystemForwarder("mqtt")
+        self._pending_subs: List[Tuple[str, int]] = []  # sent together by flush_subscriptions()
+        
+        # Messages handed from paho's network thread to the asyncio loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inbox: deque = deque()
+        self._inbox_lock = threading.Lock()
+        self._drain_event: Optional[asyncio.Event] = None
+        self._drainer_task: Optional[asyncio.Task] = None
         self.setup_mqtt_client()
     
     def setup_mqtt_client(self):
         """Setup MQTT client with callbacks"""
         self.client.on_connect = self.on_connect
-        self.client.on_message = self.on_message
+        # paho matches the filter and dispatches per message type, so topics need no parsing here
+        self.client.message_callback_add(DATA_TOPIC, self.on_data_message)
+        self.client.message_callback_add(STATUS_TOPIC, self.on_status_message)
         self.client.on_disconnect = self.on_disconnect
     
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, reason_code, properties):
         """MQTT connection callback"""
-        if rc == 0:
+        if not reason_code.is_failure:
             logger.info("✅ MQTT broker connected successfully")
-            # Subscribe to all JalRakshā sensor topics
-            client.subscribe("jalraksha/sensors/+/data")
-            client.subscribe("jalraksha/sensors/+/status")
+            # Subscribe to all JalRakshā sensor topics in one request
+            client.subscribe(SENSOR_TOPICS, qos=0)
         else:
-            logger.error(f"❌ MQTT connection failed with code {rc}")
+            logger.error(f"❌ MQTT connection failed: {reason_code}")
+    
+    def on_data_message(self, client, userdata, msg):
+        """MQTT callback for jalraksha/sensors/+/data"""
+        self._enqueue(msg.topic[len(TOPIC_PREFIX):-len("/data")], "data", msg.payload)
     
-    def on_message(self, client, userdata, msg):
-        """MQTT message callback"""
+    def on_status_message(self, client, userdata, msg):
+        """MQTT callback for jalraksha/sensors/+/status"""
+        self._enqueue(msg.topic[len(TOPIC_PREFIX):-len("/status")], "status", msg.payload)
+    
+    def _enqueue(self, node_id: str, message_type: str, payload: bytes):
+        """Queue a message for the event loop (runs on paho's network thread)"""
         try:
-            topic_parts = msg.topic.split('/')
-            if len(topic_parts) >= 4:
-                node_id = topic_parts[2]
-                message_type = topic_parts[3]
-                
-                data = json.loads(msg.payload.decode())
+            if self._loop is not None:
+                data = orjson.loads(payload)  # parses bytes directly, no decode copy
                 
-                if message_type == "data":
-                    asyncio.create_task(self.handle_sensor_data(node_id, data))
-                elif message_type == "status":
-                    asyncio.create_task(self.handle_status_update(node_id, data))
+                with self._inbox_lock:
+                    was_empty = not self._inbox
+                    self._inbox.append((node_id, message_type, data))
+                # One loop wakeup per burst rather than a Task per message
+                if was_empty:
+                    self._loop.call_soon_threadsafe(self._drain_event.set)
                     
         except Exception as e:
             logger.error(f"❌ MQTT message processing error: {str(e)}")
     
-    def on_disconnect(self, client, userdata, rc):
+    async def _drainer(self):
+        """Dispatch messages queued by the MQTT callbacks on the event loop"""
+        while True:
+            await self._drain_event.wait()
+            self._drain_event.clear()
+            with self._inbox_lock:
+                batch = list(self._inbox)
+                self._inbox.clear()
+            
+            for node_id, message_type, data in batch:
+                if message_type == "data":
+                    await self.handle_sensor_data(node_id, data)
+                elif message_type == "status":
+                    await self.handle_status_update(node_id, data)
+    
+    def on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
         """MQTT disconnection callback"""
-        logger.warning("⚠️ MQTT broker disconnected")
+        logger.warning(f"⚠️ MQTT broker disconnected: {reason_code}")
     
     async def connect(self):
         """Connect to MQTT broker"""
         try:
+            self._loop = asyncio.get_running_loop()
+            self._drain_event = asyncio.Event()
+            self._drainer_task = asyncio.create_task(self._drainer())
             self.client.connect(self.broker_host, self.broker_port, 60)
             self.client.loop_start()
             logger.info(f"✅ MQTT client connected to {self.broker_host}:{self.broker_port}")
         except Exception as e:
             logger.error(f"❌ MQTT connection error: {str(e)}")
     
+    async def aclose(self):
+        """Disconnect from the MQTT broker and flush pending forwards"""
+        self.client.loop_stop()
+        self.client.disconnect()
+        if self._drainer_task is not None:
+            self._drainer_task.cancel()
+            try:
+                await self._drainer_task
+            except asyncio.CancelledError:
+                pass
+            self._drainer_task = None
+        await self.forwarder.aclose()
+    
     async def register_node(self, node: SensorNode) -> bool:
         """Register an MQTT sensor node"""
         try:
             self.active_nodes[node.node_id] = node
+            self.node_state.add(node)
             
-            # Subscribe to node-specific topics
-            self.client.subscribe(f"jalraksha/sensors/{node.node_id}/data")
-            self.client.subscribe(f"jalraksha/sensors/{node.node_id}/status")
+            # Queue node-specific topics; flush_subscriptions() sends them in one SUBSCRIBE
+            self._pending_subs.append((f"{TOPIC_PREFIX}{node.node_id}/data", 0))
+            self._pending_subs.append((f"{TOPIC_PREFIX}{node.node_id}/status", 0))
             
             logger.info(f"✅ MQTT node {node.node_id} registered successfully")
             return True
@@ -175,14 +424,22 @@ class MQTTHandler:
             logger.error(f"❌ MQTT registration error for {node.node_id}: {str(e)}")
             return False
     
+    def flush_subscriptions(self):
+        """Subscribe to all queued node topics with a single SUBSCRIBE packet"""
+        if self._pending_subs:
+            try:
+                self.client.subscribe(self._pending_subs)
+                logger.info(f"✅ MQTT subscribed to {len(self._pending_subs)} node topics")
+                self._pending_subs = []
+            except Exception as e:
+                logger.error(f"❌ MQTT subscribe error: {str(e)}")
+    
     async def handle_sensor_data(self, node_id: str, data: Dict[str, Any]):
         """Handle incoming sensor data from MQTT"""
         try:
             if node_id in self.active_nodes:
-                node = self.active_nodes[node_id]
-                node.last_seen = datetime.now()
-                node.status = 'online'
-                node.data = data
+                self.node_state.touch(node_id)
+                self.active_nodes[node_id].data = data
                 
                 # Forward to main system
                 await self.forward_to_system(node_id, data)
@@ -194,32 +451,19 @@ class MQTTHandler:
         """Handle sensor status updates from MQTT"""
         try:
             if node_id in self.active_nodes:
-                node = self.active_nodes[node_id]
-                node.status = data.get('status', 'unknown')
-                node.last_seen = datetime.now()
+                self.node_state.touch(node_id, data.get('status', 'unknown'))
                 
         except Exception as e:
             logger.error(f"❌ MQTT status update error for {node_id}: {str(e)}")
     
     async def forward_to_system(self, node_id: str, data: Dict[str, Any]):
-        """Forward MQTT data to main JalRakshā system"""
-        try:
-            payload = {
-                "node_id": node_id,
-                "protocol": "mqtt",
-                "timestamp": datetime.now().isoformat(),
-                "data": data
-            }
-            
-            response = requests.post("http://localhost:8000/api/v1/iot/sensor-data", 
-                                  json=payload, timeout=5)
-            if response.status_code == 200:
-                logger.info(f"✅ MQTT data forwarded for {node_id}")
-            else:
-                logger.error(f"❌ Failed to forward MQTT data for {node_id}")
-                
-        except Exception as e:
-            logger.error(f"❌ MQTT forward error for {node_id}: {str(e)}")
+        """Queue MQTT data for batched forwarding to main JalRakshā system"""
+        await self.forwarder.submit({
+            "node_id": node_id,
+            "protocol": "mqtt",
+            "timestamp": ISO_CLOCK.now(),
+            "data": data
+        })
 
 class SensorHealthMonitor:
     """Monitor sensor health and connectivity status"""
@@ -228,15 +472,18 @@ class SensorHealthMonitor:
         self.health_check_interval = 30  # seconds
         self.timeout_threshold = 300  # 5 minutes
         self.sensor_database = "sensor_health.db"
+        
+        # One long-lived autocommit connection instead of a connect/close per health update
+        self._conn = sqlite3.connect(self.sensor_database, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
         self.init_database()
     
     def init_database(self):
         """Initialize sensor health database"""
         try:
-            conn = sqlite3.connect(self.sensor_database)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._conn.execute('''
                 CREATE TABLE IF NOT EXISTS sensor_health (
                     node_id TEXT PRIMARY KEY,
                     name TEXT,
@@ -251,72 +498,51 @@ class SensorHealthMonitor:
                 )
             ''')
             
-            conn.commit()
-            conn.close()
             logger.info("✅ Sensor health database initialized")
             
         except Exception as e:
             logger.error(f"❌ Database initialization error: {str(e)}")
     
-    async def check_sensor_health(self, node: SensorNode) -> Dict[str, Any]:
-        """Check individual sensor health"""
-        try:
-            current_time = datetime.now()
-            health_score = 100
-            
-            # Check if sensor is responsive
-            if node.last_seen:
-                time_diff = (current_time - node.last_seen).total_seconds()
-                
-                if time_diff > self.timeout_threshold:
-                    node.status = 'offline'
-                    health_score = 0
-                elif time_diff > 60:  # 1 minute
-                    health_score = 50
-                elif time_diff > 30:  # 30 seconds
-                    health_score = 75
-            else:
-                node.status = 'offline'
-                health_score = 0
-            
-            # Update database
-            await self.update_health_database(node, health_score)
-            
-            return {
-                "node_id": node.node_id,
-                "status": node.status,
-                "health_score": health_score,
-                "last_seen": node.last_seen.isoformat() if node.last_seen else None,
-                "response_time": time_diff if node.last_seen else None
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Health check error for {node.node_id}: {str(e)}")
-            return {"node_id": node.node_id, "status": "error", "health_score": 0}
+    def score_staleness(self, time_diff: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score sensor health from seconds since last message; returns (health_scores, offline_mask)"""
+        offline = time_diff > self.timeout_threshold
+        health_scores = np.select(
+            [offline, time_diff > 60, time_diff > 30],  # 5 minutes, 1 minute, 30 seconds
+            [0, 50, 75],
+            default=100
+        )
+        return health_scores, offline
     
-    async def update_health_database(self, node: SensorNode, health_score: int):
-        """Update sensor health in database"""
+    async def update_health_database(self, node_state: NodeState, health_scores: np.ndarray):
+        """Update sensor health in database for every node in node_state"""
+        now_iso = datetime.now().isoformat()
+        rows = [(
+            node.node_id,
+            node.name,
+            node.sensor_type,
+            node.protocol,
+            status,
+            monotonic_to_iso(last_seen),
+            health_score,
+            now_iso
+        ) for node, status, last_seen, health_score in zip(
+            node_state.nodes, node_state.status.tolist(),
+            node_state.last_seen.tolist(), health_scores.tolist()
+        )]
+        
         try:
-            conn = sqlite3.connect(self.sensor_database)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO sensor_health 
-                (node_id, name, sensor_type, protocol, status, last_seen, health_score, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                node.node_id,
-                node.name,
-                node.sensor_type,
-                node.protocol,
-                node.status,
-                node.last_seen.isoformat() if node.last_seen else None,
-                health_score,
-                datetime.now().isoformat()
-            ))
-            
-            conn.commit()
-            conn.close()
+            # One transaction (and one WAL sync) per health cycle
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany('''
+                    INSERT OR REPLACE INTO sensor_health 
+                    (node_id, name, sensor_type, protocol, status, last_seen, health_score, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
             
         except Exception as e:
             logger.error(f"❌ Database update error: {str(e)}")
@@ -324,10 +550,7 @@ class SensorHealthMonitor:
     async def get_all_sensor_health(self) -> List[Dict[str, Any]]:
         """Get health status of all sensors"""
         try:
-            conn = sqlite3.connect(self.sensor_database)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            cursor = self._conn.execute('''
                 SELECT node_id, name, sensor_type, protocol, status, 
                        last_seen, health_score, error_count
                 FROM sensor_health
@@ -347,19 +570,24 @@ class SensorHealthMonitor:
                     "error_count": row[7]
                 })
             
-            conn.close()
             return results
             
         except Exception as e:
             logger.error(f"❌ Get health status error: {str(e)}")
             return []
+    
+    def close(self):
+        """Close the sensor health database connection"""
+        self._conn.close()
 
 class IoTProtocolManager:
     """Main IoT Protocol Manager - Coordinates all protocols"""
     
     def __init__(self):
-        self.lorawan_handler = LoRaWANHandler()
-        self.mqtt_handler = MQTTHandler()
+        # Shared with both handlers so health checks run in one vectorized pass
+        self.node_state = NodeState()
+        self.lorawan_handler = LoRaWANHandler(node_state=self.node_state)
+        self.mqtt_handler = MQTTHandler(node_state=self.node_state)
         self.health_monitor = SensorHealthMonitor()
         self.all_nodes: Dict[str, SensorNode] = {}
         
@@ -377,6 +605,14 @@ class IoTProtocolManager:
         except Exception as e:
             logger.error(f"❌ IoT Protocol Manager initialization error: {str(e)}")
     
+    async def shutdown(self):
+        """Stop all IoT protocol handlers and release their connections"""
+        await self.mqtt_handler.aclose()
+        await self.lorawan_handler.aclose()
+        await close_http()
+        self.health_monitor.close()
+        logger.info("🛑 IoT Protocol Manager shut down")
+    
     async def register_sample_sensors(self):
         """Register sample IoT sensors across India"""
         sample_sensors = [
@@ -409,22 +645,38 @@ class IoTProtocolManager:
                       "drainage", "lorawan", {"frequency": "868.7", "spreading_factor": 8}),
         ]
         
+        lorawan_sensors = []
         for sensor in sample_sensors:
             self.all_nodes[sensor.node_id] = sensor
+            self.node_state.add(sensor)
             
             if sensor.protocol == "mqtt":
                 await self.mqtt_handler.register_node(sensor)
             elif sensor.protocol == "lorawan":
-                await self.lorawan_handler.register_node(sensor)
+                lorawan_sensors.append(sensor)
+        
+        # One SUBSCRIBE packet and one gateway request for the whole fleet
+        self.mqtt_handler.flush_subscriptions()
+        await self.lorawan_handler.register_nodes(lorawan_sensors)
+    
+    def score_all_nodes(self) -> np.ndarray:
+        """Check every node's health at once, marking stale nodes offline"""
+        health_scores, offline = self.health_monitor.score_staleness(
+            time.monotonic() - self.node_state.last_seen
+        )
+        self.node_state.status[offline] = 'offline'
+        return health_scores
     
     async def get_sensor_map_data(self) -> List[Dict[str, Any]]:
         """Get sensor data for map visualization"""
         try:
             sensor_data = []
             
-            for node_id, node in self.all_nodes.items():
-                health_info = await self.health_monitor.check_sensor_health(node)
-                
+            state = self.node_state
+            health_scores = self.score_all_nodes()
+            for node, status, last_seen, health_score in zip(
+                state.nodes, state.status.tolist(), state.last_seen.tolist(), health_scores.tolist()
+            ):
                 sensor_data.append({
                     "node_id": node.node_id,
                     "name": node.name,
@@ -432,9 +684,9 @@ class IoTProtocolManager:
                     "lng": node.lng,
                     "sensor_type": node.sensor_type,
                     "protocol": node.protocol,
-                    "status": node.status,
-                    "health_score": health_info.get("health_score", 0),
-                    "last_seen": node.last_seen.isoformat() if node.last_seen else None,
+                    "status": status,
+                    "health_score": health_score,
+                    "last_seen": monotonic_to_iso(last_seen),
                     "data": node.data or {}
                 })
             
@@ -450,8 +702,8 @@ class IoTProtocolManager:
             try:
                 logger.info("🔍 Running sensor health check...")
                 
-                for node_id, node in self.all_nodes.items():
-                    await self.health_monitor.check_sensor_health(node)
+                health_scores = self.score_all_nodes()
+                await self.health_monitor.update_health_database(self.node_state, health_scores)
                 
                 await asyncio.sleep(self.health_monitor.health_check_interval)
                 
@@ -468,14 +720,23 @@ async def main():
     await manager.initialize()
     
     # Start health monitoring in background
-    asyncio.create_task(manager.start_health_monitoring())
+    health_task = asyncio.create_task(manager.start_health_monitoring())
+    
+    # Keep running until SIGINT/SIGTERM, without waking the loop in the meantime
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C cancels main() through asyncio.run instead
     
-    # Keep running
     try:
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
+        await stop.wait()
         logger.info("🛑 IoT Protocol Manager stopped")
+    finally:
+        health_task.cancel()
+        await manager.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -4,6 +4,7 @@ Test script for IoT Simulator
 Tests the fixed IoT simulator with correct API endpoints
 """
 
+import asyncio
 import requests
 import json
 import time
@@ -63,7 +64,7 @@ def test_iot_simulator():
     
     # Import and test the simulator
     try:
-        from enhanced_iot_simulator import simulate_city_monitoring, send_to_fastapi
+        from enhanced_iot_simulator import create_session, send_to_fastapi
         
         # Test with Mumbai
         print("Testing Mumbai simulation...")
@@ -76,7 +77,11 @@ def test_iot_simulator():
         }
         
         # Test prediction
-        prediction = send_to_fastapi(sensor_data)
+        async def predict_once():
+            async with create_session() as session:
+                return await send_to_fastapi(session, sensor_data)
+        
+        prediction = asyncio.run(predict_once())
         print(f"Prediction result: {prediction}")
         
         if prediction and 'risk_level' in prediction: